@@ -0,0 +1,170 @@
+"""
+Local stand-ins for the Financial Modeling Prep and Reddit endpoints the backend calls,
+with configurable latency, error rate and 429 injection. Used by run_benchmark.py, and
+can also be run on its own:
+
+    python benchmarks/fake_upstreams.py --port 9100 --latency-ms 80 --rate-limit-rate 0.01
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class FakeUpstreamConfig:
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 20, error_rate: float = 0.0, rate_limit_rate: float = 0.0, ticker_count: int = 6000, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.ticker_count = ticker_count
+        self.seed = seed
+
+
+class FakeUpstreams:
+    """Serves FMP routes under /api/v3 and Reddit search and new listings under /r/{subreddit}/."""
+
+    def __init__(self, config: FakeUpstreamConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.calls: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.tickers = self._generate_tickers(config.ticker_count)
+        self._post_counter = 0
+
+    def _generate_tickers(self, count: int) -> List[Dict[str, Any]]:
+        rng = random.Random(self.config.seed)
+        tickers, seen = [], set()
+        while len(tickers) < count:
+            symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+            if symbol in seen:
+                continue
+            seen.add(symbol)
+            tickers.append({
+                "symbol": symbol,
+                "name": f"{symbol.title()} {rng.choice(['Holdings', 'Technologies', 'Group', 'Therapeutics'])}, Inc.",
+                "exchangeShortName": rng.choice(["NASDAQ", "NYSE", "AMEX", "OTC"]),
+                "type": rng.choice(["stock", "stock", "stock", "etf"]),
+            })
+        return tickers
+
+    async def _simulate(self, route: str) -> Optional[web.Response]:
+        """Applies latency and fault injection. Returns an error response or None."""
+        self.calls[route] += 1
+        delay = max(self.config.latency_ms + self.random.uniform(-self.config.jitter_ms, self.config.jitter_ms), 0)
+        await asyncio.sleep(delay / 1000)
+        roll = self.random.random()
+        if roll < self.config.rate_limit_rate:
+            self.statuses[f"{route}:429"] += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1"})
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.statuses[f"{route}:500"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        self.statuses[f"{route}:200"] += 1
+        return None
+
+    async def stock_list(self, request: web.Request) -> web.Response:
+        return await self._simulate("fmp:stock/list") or web.json_response(self.tickers)
+
+    async def quote(self, request: web.Request) -> web.Response:
+        failure = await self._simulate("fmp:quote")
+        if failure:
+            return failure
+        quotes = []
+        for symbol in request.match_info["symbols"].split(","):
+            price = round(self.random.uniform(1, 500), 2)
+            quotes.append({
+                "symbol": symbol.upper(),
+                "price": price,
+                "changesPercentage": round(self.random.uniform(-8, 8), 2),
+                "marketCap": int(price * self.random.randint(10**6, 10**9)),
+                "peRatio": round(self.random.uniform(5, 80), 2),
+            })
+        return web.json_response(quotes)
+
+    async def press_releases(self, request: web.Request) -> web.Response:
+        failure = await self._simulate("fmp:press-releases")
+        if failure:
+            return failure
+        symbol = request.match_info["symbol"].upper()
+        limit = int(request.query.get("limit", 10))
+        return web.json_response([
+            {"symbol": symbol, "title": f"{symbol} announces update #{i}", "url": f"https://example.com/{symbol}/{i}", "publishedDate": "2024-01-01 09:00:00"}
+            for i in range(limit)
+        ])
+
+    def _post(self, query: str) -> Dict[str, Any]:
+        self._post_counter += 1
+        mood = self.random.choice(["to the moon, great buy", "terrible earnings, selling", "holding steady", "huge upside here"])
+        return {"kind": "t3", "data": {
+            "name": f"t3_{self._post_counter:x}",
+            "title": f"{query} {mood}",
+            "selftext": f"Thoughts on {query}? Post {self._post_counter}",
+            "permalink": f"/r/fake/comments/{self._post_counter:x}/",
+            "created_utc": time.time(),
+        }}
+
+    async def reddit_search(self, request: web.Request) -> web.Response:
+        failure = await self._simulate("reddit:search")
+        if failure:
+            return failure
+        query = request.query.get("q", "")
+        limit = int(request.query.get("limit", 25))
+        # Incremental pages ("before") only see a few new posts; full pages are filled.
+        count = self.random.randint(0, 3) if "before" in request.query else limit
+        return web.json_response({"kind": "Listing", "data": {"children": [self._post(query) for _ in range(count)]}})
+
+    async def reddit_new(self, request: web.Request) -> web.Response:
+        failure = await self._simulate("reddit:new")
+        if failure:
+            return failure
+        limit = int(request.query.get("limit", 25))
+        symbols = [ticker["symbol"] for ticker in self.tickers[:200]]
+        return web.json_response({"kind": "Listing", "data": {"children": [self._post(f"${self.random.choice(symbols)}") for _ in range(limit)]}})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "statuses": dict(self.statuses)})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v3/stock/list", self.stock_list)
+        app.router.add_get("/api/v3/quote/{symbols}", self.quote)
+        app.router.add_get("/api/v3/press-releases/{symbol}", self.press_releases)
+        app.router.add_get("/r/{subreddit}/search.json", self.reddit_search)
+        app.router.add_get("/r/{subreddit}/new.json", self.reddit_new)
+        app.router.add_get("/__stats", self.stats)
+        return app
+
+
+async def start_fake_upstreams(config: FakeUpstreamConfig, host: str = "127.0.0.1", port: int = 0):
+    """Starts the stand-in server. Returns (FakeUpstreams, AppRunner, base_url)."""
+    upstreams = FakeUpstreams(config)
+    runner = web.AppRunner(upstreams.build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return upstreams, runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local FMP and Reddit stand-in servers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeUpstreamConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
+    web.run_app(FakeUpstreams(config).build_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
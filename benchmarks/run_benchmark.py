@@ -0,0 +1,213 @@
+"""
+Load test for the backend against local FMP and Reddit stand-ins.
+
+Starts benchmarks/fake_upstreams.py in-process, launches `uvicorn main:app` pointed at it
+through FMP_BASE_URL / REDDIT_BASE_URL, drives concurrent /analyze and /tickers traffic
+and prints a JSON report (requests/s, p50/p95/p99 per endpoint, upstream call counts and
+server memory growth), e.g.:
+
+    python benchmarks/run_benchmark.py --requests 5000 --concurrency 64 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from fake_upstreams import FakeUpstreamConfig, start_fake_upstreams
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree_rss_kb(pid: int) -> Optional[int]:
+    """Sums VmRSS of pid and its descendants (Linux /proc only)."""
+    try:
+        total = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+        return total
+    except OSError:
+        return None
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(percentile / 100 * len(sorted_values) + 0.5)) - 1))
+    return round(sorted_values[index] * 1000, 3)
+
+
+async def _wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Backend at {base_url} did not become ready within {timeout}s.")
+
+
+async def _drive_load(base_url: str, symbols: List[Dict[str, str]], total_requests: int, concurrency: int, tickers_ratio: float, zipf_s: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** zipf_s for rank in range(len(symbols))]
+    plan = []
+    for _ in range(total_requests):
+        if rng.random() < tickers_ratio:
+            plan.append(("/tickers", "/tickers"))
+        else:
+            stock = rng.choices(symbols, weights)[0]
+            plan.append(("/analyze", f"/analyze?symbol={stock['symbol']}&name={aiohttp.helpers.quote(stock['name'])}"))
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def _worker():
+            while not queue.empty():
+                route, path = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    async with session.get(base_url + path) as response:
+                        await response.read()
+                        statuses[route][str(response.status)] += 1
+                except aiohttp.ClientError as e:
+                    statuses[route][type(e).__name__] += 1
+                latencies[route].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report: Dict[str, Any] = {"elapsed_seconds": round(elapsed, 3), "requests": total_requests, "requests_per_second": round(total_requests / elapsed, 1), "endpoints": {}}
+    for route, values in latencies.items():
+        values.sort()
+        report["endpoints"][route] = {
+            "requests": len(values),
+            "requests_per_second": round(len(values) / elapsed, 1),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": round(values[-1] * 1000, 3),
+            "statuses": dict(statuses[route]),
+        }
+    return report
+
+
+async def run(args) -> Dict[str, Any]:
+    config = FakeUpstreamConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate, args.ticker_count, args.seed)
+    upstreams, runner, upstream_url = await start_fake_upstreams(config)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix="hype-bench-")
+    env = {
+        **os.environ,
+        "FMP_API_KEY": "benchmark",
+        "FMP_BASE_URL": f"{upstream_url}/api/v3",
+        "REDDIT_BASE_URL": upstream_url,
+        "CACHE_DB_PATH": os.path.join(workdir, "cache.db") if args.shared_cache else "",
+        "PREFETCH_ENABLED": "true" if args.prefetch else "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await _wait_until_ready(base_url)
+        symbols = [t for t in upstreams.tickers if t["exchangeShortName"] in ("NASDAQ", "NYSE") and t["type"] == "stock"][:args.symbols]
+        rss_start = _process_tree_rss_kb(server.pid)
+
+        warmup = None
+        if args.warmup:
+            warmup = await _drive_load(base_url, symbols, args.warmup, args.concurrency, args.tickers_ratio, args.zipf, args.seed + 1)
+        upstream_before = Counter(upstreams.calls)
+        measured = await _drive_load(base_url, symbols, args.requests, args.concurrency, args.tickers_ratio, args.zipf, args.seed)
+        upstream_during = Counter(upstreams.calls)
+        upstream_during.subtract(upstream_before)
+        rss_end = _process_tree_rss_kb(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        await runner.cleanup()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": measured,
+        "warmup": {"requests": warmup["requests"], "requests_per_second": warmup["requests_per_second"]} if warmup else None,
+        "upstream_calls": {
+            "measured": dict(upstream_during),
+            "measured_total": sum(upstream_during.values()),
+            "all": dict(upstreams.calls),
+            "statuses": dict(upstreams.statuses),
+        },
+        "memory": {
+            "rss_start_kb": rss_start,
+            "rss_end_kb": rss_end,
+            "rss_growth_kb": rss_end - rss_start if rss_start is not None and rss_end is not None else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend against local FMP and Reddit stand-ins.")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--symbols", type=int, default=200, help="Distinct symbols to analyze")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for symbol popularity")
+    parser.add_argument("--tickers-ratio", type=float, default=0.1, help="Share of requests going to /tickers")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--ticker-count", type=int, default=6000)
+    parser.add_argument("--shared-cache", action="store_true", help="Enable the on-disk shared cache store")
+    parser.add_argument("--prefetch", action="store_true", help="Enable the hot-symbol prefetch scheduler")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(rendered + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from cache_store import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("value", "timestamp", "ttl", "encoded")
+
+    def __init__(self, value: Any, timestamp: float, ttl: float, encoded: Any = None):
+        self.value = value
+        self.timestamp = timestamp
+        self.ttl = ttl
+        self.encoded = encoded
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.timestamp
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.age(now) < self.ttl
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry TTLs and a stale window.
+
+    Entries younger than their TTL are fresh. Entries past their TTL but still within
+    `stale_ttl` can be served while a refresh runs in the background (stale-while-revalidate);
+    anything older is dropped on access. When the cache is full the least recently used
+    entry is evicted. All in-memory operations are synchronous and never await, so they are
+    safe to call from coroutines without a lock.
+
+    An optional CacheBackend acts as a shared second level: load_from_backend() pulls in a
+    newer entry written by another worker (or before a restart), and persist() writes an
+    entry through. Both run the backend in a worker thread.
+
+    With an `encoder`, every write also stores encoder(value) on the entry (e.g. the
+    serialized response body), so readers can reuse it instead of re-encoding the value.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 1000,
+        stale_ttl: float = 0,
+        backend: Optional[CacheBackend] = None,
+        encoder: Optional[Callable[[Any], Any]] = None,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.encoder = encoder
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_loads = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Returns the raw entry (fresh or stale) without touching stats or LRU order."""
+        return self._entries.get(key)
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """Returns (value, is_fresh). Expired entries outside the stale window count as misses."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        now = time.time()
+        age = entry.age(now)
+        if age < entry.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value, True
+        if age < entry.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return entry.value, False
+
+        del self._entries[key]
+        self.expirations += 1
+        self.misses += 1
+        return None, False
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the value only if it is fresh."""
+        value, fresh = self.lookup(key)
+        return value if fresh else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, timestamp: Optional[float] = None):
+        encoded = self.encoder(value) if self.encoder is not None else None
+        self._entries[key] = CacheEntry(value, timestamp if timestamp is not None else time.time(), ttl if ttl is not None else self.ttl, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted {evicted_key} from {self.name} cache.")
+
+    async def load_from_backend(self, key: str) -> bool:
+        """Loads key from the backend if it holds a newer, still servable entry. Returns True if loaded."""
+        if self.backend is None:
+            return False
+        stored = await asyncio.to_thread(self.backend.get, self.name, key)
+        if stored is None:
+            return False
+        value, timestamp, ttl = stored
+        current = self._entries.get(key)
+        if current is not None and current.timestamp >= timestamp:
+            return False
+        if time.time() - timestamp >= ttl + self.stale_ttl:
+            return False
+        self.set(key, value, ttl=ttl, timestamp=timestamp)
+        self.backend_loads += 1
+        return True
+
+    async def persist(self, key: str):
+        """Writes the current entry for key through to the backend."""
+        entry = self._entries.get(key)
+        if self.backend is None or entry is None:
+            return
+        await asyncio.to_thread(self.backend.set, self.name, key, entry.value, entry.timestamp, entry.ttl)
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend_loads": self.backend_loads,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,149 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Interface for a shared, persistent second-level store behind TTLCache.
+    Entries are stored per (namespace, key) together with the timestamp and TTL they were
+    written with, so every worker applies the same expiry rules. Implementations must be
+    safe to call from worker threads and must never raise on storage errors.
+    """
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Returns (value, timestamp, ttl) or None."""
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, timestamp: float, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def purge_expired(self, grace_seconds: float = 0, namespace_grace: Optional[Dict[str, float]] = None) -> int:
+        """
+        Deletes entries older than their TTL plus a grace period: namespace_grace[namespace]
+        for the namespaces it lists, grace_seconds for all others. Returns the number removed.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    SQLite cache store in WAL mode, shared by every uvicorn worker on the host and kept
+    across restarts. WAL lets readers proceed while another worker writes; synchronous=NORMAL
+    skips the fsync on each commit, which is safe in WAL mode for a cache. Each thread
+    gets its own connection.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 2000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " timestamp REAL NOT NULL,"
+                " ttl REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key)"
+                ") WITHOUT ROWID"
+            )
+        logger.info(f"SQLite cache backend ready at {path}.")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float, float]]:
+        try:
+            row = self._connection().execute(
+                "SELECT value, timestamp, ttl FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache read failed for {namespace}/{key}: {e}")
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), row[1], row[2]
+        except ValueError as e:
+            logger.warning(f"Discarding undecodable cache entry {namespace}/{key}: {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, timestamp: float, ttl: float):
+        try:
+            payload = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not persisting {namespace}/{key}, value is not JSON serializable: {e}")
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO cache_entries (namespace, key, value, timestamp, ttl) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, timestamp = excluded.timestamp, ttl = excluded.ttl "
+                    "WHERE excluded.timestamp >= cache_entries.timestamp",
+                    (namespace, key, payload, timestamp, ttl),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache write failed for {namespace}/{key}: {e}")
+
+    def delete(self, namespace: str, key: str):
+        try:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache delete failed for {namespace}/{key}: {e}")
+
+    def purge_expired(self, grace_seconds: float = 0, namespace_grace: Optional[Dict[str, float]] = None) -> int:
+        namespace_grace = namespace_grace or {}
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                purged = 0
+                for namespace, grace in namespace_grace.items():
+                    cursor = conn.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND timestamp + ttl + ? < ?", (namespace, grace, now)
+                    )
+                    purged += cursor.rowcount
+                placeholders = ",".join("?" * len(namespace_grace))
+                cursor = conn.execute(
+                    f"DELETE FROM cache_entries WHERE namespace NOT IN ({placeholders}) AND timestamp + ttl + ? < ?",
+                    (*namespace_grace, grace_seconds, now),
+                )
+                return purged + cursor.rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache purge failed: {e}")
+            return 0
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
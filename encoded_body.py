@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import Request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing.
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def dumps(data: Any) -> bytes:
+    """Encodes data as compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS matches json.dumps, which stringifies int and float dict keys.
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_hash(data: Any) -> str:
+    """Returns a short hex digest of data's JSON encoding."""
+    return hashlib.blake2b(dumps(data), digest_size=16).hexdigest()
+
+
+def make_etag(*parts: str) -> str:
+    """Builds a weak ETag from content hashes; weak because the same content is served with several encodings."""
+    digest = parts[0] if len(parts) == 1 else hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedBody:
+    """A JSON response body encoded once, with its ETag and gzip and (if available) brotli variants."""
+
+    __slots__ = ("body", "etag", "gzip", "br")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = make_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.gzip = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    @classmethod
+    def from_data(cls, data: Any) -> "EncodedBody":
+        return cls(dumps(data))
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def validator_headers(etag: str, last_modified: Optional[float]) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float]) -> bool:
+    """
+    Evaluates If-None-Match (weak comparison) against etag, or, only when that header is
+    absent, If-Modified-Since against last_modified.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def encoded_response(request: Request, encoded: EncodedBody, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Returns the smallest pre-built variant of encoded that the client accepts."""
+    response_headers = dict(headers or {})
+    body = encoded.body
+    if encoded.gzip is not None:
+        response_headers["Vary"] = "Accept-Encoding"
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        if encoded.br is not None and "br" in accepted:
+            body = encoded.br
+            response_headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = encoded.gzip
+            response_headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SourceResult:
+    """Outcome of one source in a fan-out: status is "ok", "error" or "timeout"."""
+
+    __slots__ = ("source", "status", "value", "error", "elapsed", "hedged")
+
+    def __init__(self, source: str, status: str, value: Any = None, error: Optional[BaseException] = None, elapsed: float = 0.0, hedged: bool = False):
+        self.source = source
+        self.status = status
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+        self.hedged = hedged
+
+
+async def fan_out(
+    sources: Dict[str, Callable[[], Awaitable[Any]]],
+    deadline_seconds: float,
+    hedge_after_seconds: Optional[float] = None,
+    hedgeable: Iterable[str] = (),
+) -> AsyncIterator[SourceResult]:
+    """
+    Starts every source at once and yields a SourceResult for each as it completes. Sources
+    still running when `deadline_seconds` elapses are cancelled and yielded as timeouts, so
+    the whole fan-out never takes longer than the deadline.
+
+    With `hedge_after_seconds`, a source named in `hedgeable` that has not finished by then
+    gets a second, duplicate attempt; the first attempt to succeed wins and the other is
+    cancelled. Only hedge sources that are safe to run twice.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + deadline_seconds
+    hedge_at = started + hedge_after_seconds if hedge_after_seconds else None
+    hedgeable = set(hedgeable)
+
+    attempts: Dict[asyncio.Future, str] = {asyncio.ensure_future(fetch()): name for name, fetch in sources.items()}
+    remaining = set(sources)
+    hedged = set()
+    try:
+        while remaining:
+            now = loop.time()
+            if now >= deadline:
+                break
+            timeout = deadline - now
+            if hedge_at is not None and now < hedge_at:
+                timeout = min(timeout, hedge_at - now)
+
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = attempts.pop(task)
+                if name not in remaining:
+                    continue
+                error = task.exception()
+                if error is not None and name in attempts.values():
+                    # The other attempt for this source is still running and may yet succeed.
+                    continue
+                remaining.discard(name)
+                for twin in [twin for twin, twin_name in attempts.items() if twin_name == name]:
+                    twin.cancel()
+                    del attempts[twin]
+                elapsed = loop.time() - started
+                if error is not None:
+                    yield SourceResult(name, "error", error=error, elapsed=elapsed, hedged=name in hedged)
+                else:
+                    yield SourceResult(name, "ok", value=task.result(), elapsed=elapsed, hedged=name in hedged)
+
+            if hedge_at is not None and loop.time() >= hedge_at:
+                for name in (remaining & hedgeable) - hedged:
+                    logger.info(f"Source {name} is slow; sending a hedged request.")
+                    attempts[asyncio.ensure_future(sources[name]())] = name
+                    hedged.add(name)
+    finally:
+        for task in attempts:
+            task.cancel()
+
+    elapsed = loop.time() - started
+    for name in remaining:
+        yield SourceResult(name, "timeout", elapsed=elapsed, hedged=name in hedged)
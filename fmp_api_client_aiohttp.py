@@ -1,10 +1,15 @@
 import aiohttp
 import asyncio
+import heapq
+import itertools
 import logging
 import os
 import random 
+import time
 from typing import Dict, List, Any, Optional 
 
+from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS, observe_upstream
+
 logger = logging.getLogger(__name__)
 
 class FMPAPIError(Exception):
@@ -22,40 +27,232 @@ class FMPRateLimitError(FMPAPIError):
 class FMPServiceUnavailableError(FMPAPIError):
     pass
 
+class FMPBudgetExhaustedError(FMPRateLimitError):
+    pass
+
+# Request priorities, lower runs first. Interactive calls jump ahead of bulk and background work.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_BACKGROUND = 2
+
+class FMPRateLimiter:
+    """
+    Client-side quota guard for the FMP plan: a per-minute token bucket plus a per-day counter
+    (reset at 00:00 UTC). Requests that cannot get a token immediately wait in a priority queue,
+    but only if the estimated wait fits in the max wait for their priority; otherwise they fail
+    fast with FMPBudgetExhaustedError. Background requests leave a reserve of both budgets
+    untouched so interactive requests keep headroom.
+
+    The budgets are per process: with several uvicorn workers, set FMP_REQUESTS_PER_MINUTE
+    and FMP_REQUESTS_PER_DAY to the plan quota divided by the number of workers.
+    """
+
+    MAX_WAIT_SECONDS = {PRIORITY_INTERACTIVE: 2.0, PRIORITY_BULK: 10.0, PRIORITY_BACKGROUND: 5.0}
+    BACKGROUND_RESERVE_FRACTION = 0.2
+
+    def __init__(self, requests_per_minute: Optional[int] = None, requests_per_day: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_day = requests_per_day
+        self._tokens = float(requests_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._day = self._current_day()
+        self._day_count = 0
+        self._waiters: List[Any] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.granted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _current_day() -> int:
+        return int(time.time() // 86400)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.requests_per_minute:
+            elapsed = now - self._last_refill
+            self._tokens = min(float(self.requests_per_minute), self._tokens + elapsed * self.requests_per_minute / 60.0)
+        self._last_refill = now
+        day = self._current_day()
+        if day != self._day:
+            self._day = day
+            self._day_count = 0
+
+    def _minute_reserve(self, priority: int) -> float:
+        if priority >= PRIORITY_BACKGROUND and self.requests_per_minute:
+            return self.requests_per_minute * self.BACKGROUND_RESERVE_FRACTION
+        return 0.0
+
+    def _check_daily_budget(self, priority: int):
+        if not self.requests_per_day:
+            return
+        limit = self.requests_per_day
+        if priority >= PRIORITY_BACKGROUND:
+            limit = int(self.requests_per_day * (1 - self.BACKGROUND_RESERVE_FRACTION))
+        if self._day_count >= limit:
+            self.rejected += 1
+            raise FMPBudgetExhaustedError(
+                f"FMP daily request budget exhausted ({self._day_count}/{self.requests_per_day} used, "
+                f"priority {priority}). Budget resets at 00:00 UTC."
+            )
+
+    def _grant(self):
+        if self.requests_per_minute:
+            self._tokens -= 1
+        self._day_count += 1
+        self.granted += 1
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        self._refill()
+        self._check_daily_budget(priority)
+        if not self.requests_per_minute:
+            self._grant()
+            return
+
+        required = 1 + self._minute_reserve(priority)
+        ahead = sum(1 for waiter_priority, _, future in self._waiters if waiter_priority <= priority and not future.done())
+        if not ahead and self._tokens >= required:
+            self._grant()
+            return
+
+        estimated_wait = (ahead + required - self._tokens) * 60.0 / self.requests_per_minute
+        max_wait = self.MAX_WAIT_SECONDS.get(priority, self.MAX_WAIT_SECONDS[PRIORITY_BACKGROUND])
+        if estimated_wait > max_wait:
+            self.rejected += 1
+            raise FMPBudgetExhaustedError(
+                f"FMP per-minute request budget exhausted ({self.requests_per_minute}/min, {ahead} queued ahead, "
+                f"estimated wait {estimated_wait:.1f}s exceeds {max_wait:.1f}s for priority {priority})."
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        elif self._waiters[0][2] is future:
+            # The dispatcher is sleeping for a lower-priority waiter's deficit; re-plan for this one.
+            self._wakeup.set()
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            self._refill()
+            while self._waiters:
+                priority, _, future = self._waiters[0]
+                if future.done():
+                    heapq.heappop(self._waiters)
+                    continue
+                if self._tokens < 1 + self._minute_reserve(priority):
+                    break
+                heapq.heappop(self._waiters)
+                try:
+                    self._check_daily_budget(priority)
+                except FMPBudgetExhaustedError as e:
+                    future.set_exception(e)
+                    continue
+                self._grant()
+                future.set_result(None)
+            if self._waiters:
+                priority = self._waiters[0][0]
+                deficit = 1 + self._minute_reserve(priority) - self._tokens
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(deficit, 0.01) * 60.0 / self.requests_per_minute)
+                except asyncio.TimeoutError:
+                    pass
+
+    def drain(self):
+        """Empties the minute bucket, e.g. after the server answered 429 despite our accounting."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+    def usage(self) -> Dict[str, Any]:
+        self._refill()
+        queued_by_priority: Dict[str, int] = {}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued_by_priority[str(priority)] = queued_by_priority.get(str(priority), 0) + 1
+        return {
+            "per_minute": {
+                "limit": self.requests_per_minute,
+                "available": round(self._tokens, 2) if self.requests_per_minute else None,
+            },
+            "per_day": {
+                "limit": self.requests_per_day,
+                "used": self._day_count,
+                "remaining": max(self.requests_per_day - self._day_count, 0) if self.requests_per_day else None,
+                "resets_in_seconds": int((self._day + 1) * 86400 - time.time()),
+            },
+            "queued": sum(queued_by_priority.values()),
+            "queued_by_priority": queued_by_priority,
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
+
 class FMPClient:
-    BASE_URL = "https://financialmodelingprep.com/api/v3"
+    BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3")
     DEFAULT_HEADERS = {"User-Agent": "StockHypeRecommender/1.0 (Contact: emirabdullahalaku@gmail.com)"} 
+    MAX_SYMBOLS_PER_QUOTE_REQUEST = 50
+    # Idle pooled connections are kept this long, so a connection opened by warm_up() is still there for the first request.
+    KEEPALIVE_TIMEOUT_SECONDS = 60
 
-    def __init__(self, api_key: Optional[str]):
+    def __init__(self, api_key: Optional[str], requests_per_minute: Optional[int] = None, requests_per_day: Optional[int] = None):
         if not api_key:
             raise FMPConfigError("FMP API Key is required but not provided.")
         self.api_key = api_key
         self.session: Optional[aiohttp.ClientSession] = None
+        self.rate_limiter = FMPRateLimiter(requests_per_minute, requests_per_day)
         logger.info("FMPClient initialized.")
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(headers=self.DEFAULT_HEADERS) 
+            connector = aiohttp.TCPConnector(keepalive_timeout=self.KEEPALIVE_TIMEOUT_SECONDS)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.DEFAULT_HEADERS)
             logger.debug("New aiohttp ClientSession created for FMPClient.")
         return self.session
 
+    async def warm_up(self, timeout: float = 5) -> bool:
+        """
+        Opens a pooled connection (DNS, TCP and TLS) to the FMP host with an unauthenticated
+        HEAD request, so the first real request skips the handshake. Does not count against
+        the rate limit. Returns True if the host answered at all.
+        """
+        session = await self._get_session()
+        try:
+            async with session.head(self.BASE_URL, timeout=aiohttp.ClientTimeout(total=timeout)):
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not pre-open a connection to FMP: {e}")
+            return False
+
     async def close_session(self):
         if self.session and not self.session.closed:
             await self.session.close()
             self.session = None
             logger.info("aiohttp ClientSession closed for FMPClient.")
 
-    async def _make_request(self, endpoint: str, params: Optional[Dict] = None, retries: int = 3) -> Any: 
+    def get_budget_usage(self) -> Dict[str, Any]:
+        """Reports how much of the configured per-minute and per-day FMP budget is used."""
+        return self.rate_limiter.usage()
+
+    async def _make_request(self, endpoint: str, params: Optional[Dict] = None, retries: int = 3, priority: int = PRIORITY_INTERACTIVE) -> Any: 
         session = await self._get_session()
         url = f"{self.BASE_URL}/{endpoint}"
         full_params = {"apikey": self.api_key}
         if params:
             full_params.update(params)
+        # Only the first path segment is used as a metric label, to keep symbols out of label values.
+        endpoint_label = endpoint.split("/", 1)[0]
 
         for attempt in range(retries):
+            await self.rate_limiter.acquire(priority)
+            if attempt > 0:
+                UPSTREAM_RETRIES.inc(upstream="fmp", endpoint=endpoint_label)
             logger.debug(f"Making FMP API request to: {url} (Attempt {attempt + 1}/{retries})")
+            request_started = time.perf_counter()
             try:
                 async with session.get(url, params=full_params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    observe_upstream("fmp", endpoint_label, time.perf_counter() - request_started, response.status)
                     if response.status == 404:
                         raise FMPNotFoundError(f"Data not found for endpoint: {endpoint}. URL: {url}")
                     elif response.status == 429:
@@ -68,7 +265,20 @@ class FMPClient:
                     if not data:
                         return None
                     return data
-            except (FMPRateLimitError, FMPServiceUnavailableError) as e: 
+            except FMPRateLimitError as e:
+                # No blind sleep: the retry goes back through the limiter, which either
+                # schedules it within the priority's max wait or fails fast.
+                self.rate_limiter.drain()
+                if attempt < retries - 1:
+                    if self.rate_limiter.requests_per_minute:
+                        logger.warning(f"{e}. Retrying through the rate limiter...")
+                    else:
+                        wait_time = (2 ** attempt) + random.random() * 0.5
+                        logger.warning(f"{e}. No per-minute budget configured, retrying in {wait_time:.2f} seconds...")
+                        await asyncio.sleep(wait_time)
+                else:
+                    raise
+            except FMPServiceUnavailableError as e:
                 if attempt < retries - 1:
                     wait_time = (2 ** attempt) + random.random() * 0.5 
                     logger.warning(f"{e}. Retrying in {wait_time:.2f} seconds...")
@@ -76,25 +286,49 @@ class FMPClient:
                 else:
                     raise 
             except aiohttp.ClientError as e:
+                if not isinstance(e, aiohttp.ClientResponseError):
+                    observe_upstream("fmp", endpoint_label, time.perf_counter() - request_started)
+                    UPSTREAM_ERRORS.inc(upstream="fmp", endpoint=endpoint_label)
                 raise FMPAPIError(f"Network or client error during FMP API request to {endpoint}: {e}")
             except asyncio.TimeoutError:
+                observe_upstream("fmp", endpoint_label, time.perf_counter() - request_started)
+                UPSTREAM_TIMEOUTS.inc(upstream="fmp", endpoint=endpoint_label)
                 raise FMPAPIError(f"FMP API request to {endpoint} timed out.")
             except Exception as e:
                 raise FMPAPIError(f"An unexpected error occurred during FMP API request to {endpoint}: {e}")
         
         raise FMPAPIError(f"Failed to complete FMP API request to {endpoint} after {retries} attempts.")
 
-    async def get_stock_list(self) -> List[Dict[str, Any]]:
+    async def get_stock_list(self, priority: int = PRIORITY_BULK) -> List[Dict[str, Any]]:
         """Fetches a list of all available stock symbols."""
-        data = await self._make_request("stock/list")
+        data = await self._make_request("stock/list", priority=priority)
         return data if data else []
 
-    async def get_quote(self, symbol: str) -> Dict[str, Any]:
+    async def get_quote(self, symbol: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
         """Fetches quote data for a specific stock symbol."""
-        data = await self._make_request(f"quote/{symbol}")
+        data = await self._make_request(f"quote/{symbol}", priority=priority)
         return data[0] if data and isinstance(data, list) else {}
 
-    async def get_company_news(self, symbol: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_quotes(self, symbols: List[str], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches quote data for several symbols with one comma-joined multi-symbol request.
+        Callers pass at most MAX_SYMBOLS_PER_QUOTE_REQUEST symbols and chunk longer lists
+        themselves. Returns a dict keyed by symbol; symbols without a quote are absent.
+        """
+        unique_symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        if not unique_symbols:
+            return {}
+        try:
+            data = await self._make_request(f"quote/{','.join(unique_symbols)}", priority=priority)
+        except FMPNotFoundError:
+            return {}
+        quotes: Dict[str, Dict[str, Any]] = {}
+        for item in data if isinstance(data, list) else []:
+            if item.get("symbol"):
+                quotes[item["symbol"].upper()] = item
+        return quotes
+
+    async def get_company_news(self, symbol: str, limit: int = 10, priority: int = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
         """Fetches recent news for a specific company."""
-        data = await self._make_request(f"press-releases/{symbol}", {"limit": limit})
+        data = await self._make_request(f"press-releases/{symbol}", {"limit": limit}, priority=priority)
         return data if data else []
\ No newline at end of file
@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import bisect
+import logging
+import math
+import time
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+from cache_store import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+# Sampled fields, all stored as float32; NaN marks a field not reported in a sample's bucket.
+FIELDS = ("sentiment", "posts", "price", "changesPercentage")
+
+
+class SymbolHistory:
+    """
+    Fixed-capacity ring buffer of samples for one symbol: a uint32 timestamp array plus one
+    float32 array per field, preallocated so a symbol always costs capacity * 20 bytes.
+    Samples are bucketed by resolution; a second report in the same bucket updates that sample.
+    """
+
+    __slots__ = ("capacity", "timestamps", "values", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("I", bytes(4 * capacity))
+        self.values = {field: array("f", [NAN]) * capacity for field in FIELDS}
+        # Index of the next slot to write; the newest sample is at head - 1.
+        self.head = 0
+        self.size = 0
+
+    def record(self, bucket: int, fields: Dict[str, Optional[float]]):
+        newest = (self.head - 1) % self.capacity
+        if self.size and self.timestamps[newest] == bucket:
+            slot = newest
+        elif self.size and bucket < self.timestamps[newest]:
+            return  # Late report for an older bucket; history is append-only.
+        else:
+            slot = self.head
+            self.timestamps[slot] = bucket
+            for column in self.values.values():
+                column[slot] = NAN
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+        for field, value in fields.items():
+            if value is not None:
+                self.values[field][slot] = value
+
+    def _chronological(self, column: array) -> array:
+        if self.size < self.capacity:
+            return column[:self.size]
+        return column[self.head:] + column[:self.head]
+
+    def window(self, since: float) -> Dict[str, array]:
+        """Returns the samples at or after `since`, oldest first, as array slices."""
+        timestamps = self._chronological(self.timestamps)
+        start = bisect.bisect_left(timestamps, since)
+        series = {"timestamp": timestamps[start:]}
+        for field, column in self.values.items():
+            series[field] = self._chronological(column)[start:]
+        return series
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "head": self.head,
+            "size": self.size,
+            "timestamps": base64.b64encode(self.timestamps.tobytes()).decode("ascii"),
+            "values": {field: base64.b64encode(column.tobytes()).decode("ascii") for field, column in self.values.items()},
+        }
+
+    @classmethod
+    def merged(cls, ours: "SymbolHistory", theirs: "SymbolHistory", capacity: int) -> "SymbolHistory":
+        """Union of two histories by bucket, keeping the newest `capacity` buckets; where both have a field, ours wins."""
+        samples: Dict[int, Dict[str, float]] = {}
+        for history in (theirs, ours):
+            series = history.window(0)
+            for index, bucket in enumerate(series["timestamp"]):
+                sample = samples.setdefault(bucket, {})
+                for field in FIELDS:
+                    value = series[field][index]
+                    if not math.isnan(value):
+                        sample[field] = value
+        merged = cls(capacity)
+        for bucket in sorted(samples)[-capacity:]:
+            merged.record(bucket, samples[bucket])
+        return merged
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], capacity: int) -> "SymbolHistory":
+        stored_capacity, head, size = data["capacity"], data["head"], data["size"]
+        timestamps = array("I", base64.b64decode(data["timestamps"]))
+        values = {field: array("f", base64.b64decode(encoded)) for field, encoded in data["values"].items() if field in FIELDS}
+        history = cls(capacity)
+        # Replay oldest first, so a capacity changed since the save keeps the newest samples.
+        for index in range(size):
+            slot = (head - size + index) % stored_capacity
+            history.record(timestamps[slot], {
+                field: None if math.isnan(column[slot]) else column[slot] for field, column in values.items()
+            })
+        return history
+
+
+def _clean(values: array) -> List[float]:
+    return [value for value in values if not math.isnan(value)]
+
+
+def _rolling_mean(values: array, samples: int) -> List[Optional[float]]:
+    """Trailing mean over `samples` buckets via prefix sums; missing values are skipped."""
+    present = [0.0 if math.isnan(value) else 1.0 for value in values]
+    sums = [0.0] + list(accumulate(0.0 if math.isnan(value) else value for value in values))
+    counts = [0.0] + list(accumulate(present))
+    means = []
+    for end in range(1, len(values) + 1):
+        start = max(0, end - samples)
+        count = counts[end] - counts[start]
+        means.append(round((sums[end] - sums[start]) / count, 4) if count else None)
+    return means
+
+
+def _series_summary(values: array) -> Dict[str, Optional[float]]:
+    present = _clean(values)
+    if not present:
+        return {"latest": None, "mean": None, "min": None, "max": None, "delta": None}
+    return {
+        "latest": round(present[-1], 4),
+        "mean": round(sum(present) / len(present), 4),
+        "min": round(min(present), 4),
+        "max": round(max(present), 4),
+        "delta": round(present[-1] - present[0], 4),
+    }
+
+
+class HistoryStore:
+    """
+    In-process time series of sentiment and quote snapshots per symbol, kept in
+    SymbolHistory ring buffers of `retention_seconds / resolution_seconds` samples. At most
+    `max_symbols` symbols are held, least recently updated dropped first, so memory stays
+    under max_symbols * capacity * 20 bytes. With a CacheBackend, changed symbols are
+    written through by flush() and loaded back on first use after a restart. flush() merges
+    the stored row by bucket first, so workers sharing the backend keep each other's samples.
+    """
+
+    NAMESPACE = "history"
+
+    def __init__(self, resolution_seconds: int = 300, retention_seconds: int = 3 * 86400, max_symbols: int = 5000, backend: Optional[CacheBackend] = None):
+        self.resolution_seconds = resolution_seconds
+        self.retention_seconds = retention_seconds
+        self.capacity = max(1, retention_seconds // resolution_seconds)
+        self.max_symbols = max_symbols
+        self.backend = backend
+        self._histories: "OrderedDict[str, SymbolHistory]" = OrderedDict()
+        self._dirty = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.samples_recorded = 0
+
+    async def _get(self, symbol: str, create: bool) -> Optional[SymbolHistory]:
+        history = self._histories.get(symbol)
+        if history is None and self.backend is not None:
+            stored = await asyncio.to_thread(self.backend.get, self.NAMESPACE, symbol)
+            if stored is not None:
+                try:
+                    history = SymbolHistory.from_json(stored[0], self.capacity)
+                except (KeyError, ValueError, TypeError) as e:
+                    logger.warning(f"Discarding unreadable stored history for {symbol}: {e}")
+            history = self._histories.get(symbol) or history  # Another coroutine may have created it meanwhile.
+        if history is None:
+            if not create:
+                return None
+            history = SymbolHistory(self.capacity)
+        self._histories[symbol] = history
+        self._histories.move_to_end(symbol)
+        while len(self._histories) > self.max_symbols:
+            evicted, _ = self._histories.popitem(last=False)
+            self._dirty.discard(evicted)
+        return history
+
+    async def record(self, symbol: str, timestamp: Optional[float] = None, **fields: Optional[float]):
+        """Records a snapshot; fields are any of sentiment, posts, price and changesPercentage."""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown history fields: {', '.join(sorted(unknown))}")
+        history = await self._get(symbol, create=True)
+        bucket = int((timestamp if timestamp is not None else time.time()) // self.resolution_seconds * self.resolution_seconds)
+        history.record(bucket, {field: float(value) if value is not None else None for field, value in fields.items()})
+        self._dirty.add(symbol)
+        self.samples_recorded += 1
+
+    async def query(self, symbol: str, window_seconds: int, rolling_samples: int = 12) -> Optional[Dict[str, Any]]:
+        """
+        Returns the samples in the window plus aggregates: per-field latest/mean/min/max/delta,
+        a trailing rolling mean of sentiment over `rolling_samples` buckets, and the z-score
+        of the latest post count against the window. None if the symbol has no history.
+        """
+        history = await self._get(symbol, create=False)
+        if history is None:
+            return None
+        series = history.window(time.time() - window_seconds)
+        posts = _clean(series["posts"])
+        mention_volume = {"latest": None, "mean": None, "stdev": None, "zscore": None}
+        if posts:
+            mean = sum(posts) / len(posts)
+            stdev = math.sqrt(sum((value - mean) ** 2 for value in posts) / len(posts))
+            mention_volume = {
+                "latest": posts[-1],
+                "mean": round(mean, 4),
+                "stdev": round(stdev, 4),
+                "zscore": round((posts[-1] - mean) / stdev, 4) if stdev else 0.0,
+            }
+
+        return {
+            "symbol": symbol,
+            "window_seconds": window_seconds,
+            "resolution_seconds": self.resolution_seconds,
+            "samples": len(series["timestamp"]),
+            "series": {
+                field: list(values) if field == "timestamp" else [None if math.isnan(value) else round(value, 4) for value in values]
+                for field, values in series.items()
+            },
+            "aggregates": {
+                **{field: _series_summary(series[field]) for field in FIELDS},
+                "sentiment_rolling_mean": _rolling_mean(series["sentiment"], rolling_samples),
+                "mention_volume": mention_volume,
+            },
+        }
+
+    async def flush(self):
+        """Merges symbols changed since the last flush with their stored rows and writes them to the backend."""
+        if self.backend is None or not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        symbols = [symbol for symbol in dirty if symbol in self._histories]
+        stored_rows = await asyncio.to_thread(lambda: {symbol: self.backend.get(self.NAMESPACE, symbol) for symbol in symbols})
+
+        records = []
+        for symbol in symbols:
+            history = self._histories.get(symbol)
+            if history is None:
+                continue  # Evicted while the stored rows were read.
+            stored = stored_rows.get(symbol)
+            if stored is not None:
+                try:
+                    history = SymbolHistory.merged(history, SymbolHistory.from_json(stored[0], self.capacity), self.capacity)
+                    self._histories[symbol] = history
+                except (KeyError, ValueError, TypeError) as e:
+                    logger.warning(f"Overwriting unreadable stored history for {symbol}: {e}")
+            records.append((symbol, history.to_json()))
+
+        def _write():
+            now = time.time()
+            for symbol, data in records:
+                self.backend.set(self.NAMESPACE, symbol, data, now, self.retention_seconds)
+
+        await asyncio.to_thread(_write)
+        logger.debug(f"Flushed history for {len(records)} symbols.")
+
+    async def _run_flush(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Unexpected error flushing history:")
+
+    def start(self, interval_seconds: float = 60):
+        if self.backend is not None and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._run_flush(interval_seconds))
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._histories),
+            "samples_recorded": self.samples_recorded,
+            "capacity_per_symbol": self.capacity,
+            "bytes_per_symbol": self.capacity * 4 * (1 + len(FIELDS)),
+            "max_bytes": self.max_symbols * self.capacity * 4 * (1 + len(FIELDS)),
+        }
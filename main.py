@@ -1,22 +1,51 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import atexit
 import logging
 import os
 from dotenv import load_dotenv
 import time
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Awaitable, Callable, Tuple
 import asyncio
+import json
+import queue
 import re
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+from pydantic import BaseModel
 from starlette.background import BackgroundTasks
 
 
 
 load_dotenv()
 
-from reddit_scraper import scrape_reddit_data, RedditScrapingError
+import reddit_scraper
+import x_scraper
+from single_flight import SingleFlight
+from fanout import fan_out
+from metrics import REGISTRY, SENTIMENT_SOURCE_RESULTS, RequestLatencyMiddleware
+from cache import CacheEntry, TTLCache
+from encoded_body import (
+    EncodedBody,
+    FastJSONResponse,
+    content_hash,
+    dumps,
+    encoded_response,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from cache_store import SQLiteCacheBackend
+from reddit_store import RedditPostStore
+from history import HistoryStore
+from trending import TrendingScanner
+from quote_stream import QuoteHub, QuoteStreamError
+from ticker_index import TickerSearchIndex
+from ticker_snapshot import load_snapshot, save_snapshot
+from sentiment import SentimentEngine
+from prefetch import HotSymbolTracker, PrefetchScheduler, PrefetchTarget
 
 from fmp_api_client_aiohttp import (
     FMPClient,
@@ -24,11 +53,17 @@ from fmp_api_client_aiohttp import (
     FMPConfigError,
     FMPNotFoundError,
     FMPRateLimitError,
-    FMPServiceUnavailableError
+    FMPServiceUnavailableError,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BULK,
+    PRIORITY_BACKGROUND,
 )
 
 #Configuration 
 FMP_API_KEY = os.getenv("FMP_API_KEY")
+# Client-side FMP quota; leave FMP_REQUESTS_PER_DAY unset for plans without a daily cap.
+FMP_REQUESTS_PER_MINUTE = int(os.getenv("FMP_REQUESTS_PER_MINUTE", "300"))
+FMP_REQUESTS_PER_DAY = int(os.getenv("FMP_REQUESTS_PER_DAY")) if os.getenv("FMP_REQUESTS_PER_DAY") else None
 DEFAULT_SUBREDDITS = ["wallstreetbets", "stocks", "investing", "stockmarket"]
 
 # FastAPI Initialization 
@@ -36,6 +71,7 @@ app = FastAPI(
     title="Stock Hype Recommender Backend",
     description="Analyzes Reddit sentiment, live stock data, and news.",
     version="2.2.4",
+    default_response_class=FastJSONResponse,
 )
 
 # --- CORS Configuration ---
@@ -51,6 +87,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
 # Logging Configuration 
@@ -58,13 +95,19 @@ log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 log_file_handler = RotatingFileHandler('api.log', maxBytes=10485760, backupCount=5)
 log_file_handler.setFormatter(log_formatter)
 
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.INFO)
-root_logger.addHandler(log_file_handler)
-
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(log_formatter)
-root_logger.addHandler(console_handler)
+
+# Request handlers only enqueue records; a listener thread does the file and console I/O,
+# so log writes never block the event loop.
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
 
 logger = logging.getLogger(__name__)
 
@@ -75,42 +118,202 @@ fmp_client: Optional[FMPClient] = None
 async def startup_event():
     global fmp_client
     try:
-        fmp_client = FMPClient(FMP_API_KEY)
+        fmp_client = FMPClient(FMP_API_KEY, requests_per_minute=FMP_REQUESTS_PER_MINUTE, requests_per_day=FMP_REQUESTS_PER_DAY)
         logger.info("FMPClient initialized successfully during startup.")
     except FMPConfigError as e:
         logger.error(f"FMP_API_KEY is missing or invalid. FMP API features will not be available: {e}")
         fmp_client = None
+    await reddit_scraper.open_session()
+    await x_scraper.open_session()
+    if CACHE_DB_PATH:
+        _set_cache_backend(await asyncio.to_thread(SQLiteCacheBackend, CACHE_DB_PATH))
+        # Each cache keeps rows for its own stale window, e.g. the ticker list is served stale for a day.
+        stale_windows = {cache.name: cache.stale_ttl for cache in (sentiment_cache, financial_data_cache, news_cache, ticker_cache, x_scraper.post_cache)}
+        purged = await asyncio.to_thread(cache_backend.purge_expired, CACHE_STALE_SECONDS, stale_windows)
+        logger.info(f"Purged {purged} expired entries from the shared cache store.")
+    # Serving starts only after this hook returns, so the snapshot is in memory for the first request.
+    warmup_status["ticker_snapshot"] = await _load_ticker_snapshot()
+    warmup_steps = {"sentiment_model": sentiment_engine.warm_up(), "reddit_connection": reddit_scraper.warm_up()}
+    if fmp_client:
+        warmup_steps["tickers"] = _prewarm_tickers()
+        warmup_steps["fmp_connection"] = fmp_client.warm_up()
+    if x_scraper.TWITTER_BEARER_TOKEN:
+        warmup_steps["x_connection"] = x_scraper.warm_up()
+    if TRENDING_ENABLED:
+        warmup_steps["mention_matcher"] = trending_scanner.warm_up()
+    warmup_status.update({name: None for name in warmup_steps})
+    _track_background_task(asyncio.create_task(_warm_up(warmup_steps)))
+    if PREFETCH_ENABLED:
+        prefetch_scheduler.start()
+    history_store.start(HISTORY_FLUSH_SECONDS)
+    if TRENDING_ENABLED:
+        trending_scanner.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     global fmp_client
+    await prefetch_scheduler.stop()
+    await history_store.stop()
+    await trending_scanner.stop()
+    await quote_hub.stop()
     if fmp_client:
         await fmp_client.close_session()
         logger.info("FMPClient aiohttp session closed during shutdown.")
-
-sentiment_cache = {"data": {}, "lock": asyncio.Lock()}
-financial_data_cache = {"data": {}, "lock": asyncio.Lock()}
-news_cache = {"data": {}, "lock": asyncio.Lock()}
-ticker_cache = {"data": None, "timestamp": 0, "lock": asyncio.Lock()}
+    await reddit_scraper.close_session()
+    await x_scraper.close_session()
+    if cache_backend:
+        cache_backend.close()
+        _set_cache_backend(None)
+    sentiment_engine.close()
 
 CACHE_EXPIRATION_SECONDS = 300
 FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS = 300
 NEWS_CACHE_EXPIRATION_SECONDS = 600
 TICKER_CACHE_EXPIRATION_SECONDS = 86400
+# The last filtered ticker list is kept here and loaded at startup; set to an empty string to disable.
+TICKER_SNAPSHOT_PATH = os.getenv("TICKER_SNAPSHOT_PATH", "tickers.snapshot.json.gz")
+# How long past expiry a cached value may still be served while it is refreshed in the background.
+CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+# Shared on-disk cache for all workers on this host; set CACHE_DB_PATH to an empty string to disable.
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache.db")
+
+# Opened by the startup hook (not at import, so importing main creates no files) and attached
+# to every cache and store below by _set_cache_backend().
+cache_backend: Optional[SQLiteCacheBackend] = None
+
+# Each /analyze part stores a content hash when written; together they form the response ETag.
+sentiment_cache = TTLCache("sentiment", CACHE_EXPIRATION_SECONDS, CACHE_MAX_ENTRIES, CACHE_STALE_SECONDS, encoder=content_hash)
+financial_data_cache = TTLCache("financial_data", FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS, CACHE_MAX_ENTRIES, CACHE_STALE_SECONDS, encoder=content_hash)
+news_cache = TTLCache("news", NEWS_CACHE_EXPIRATION_SECONDS, CACHE_MAX_ENTRIES, CACHE_STALE_SECONDS, encoder=content_hash)
+# The ticker list is served as pre-encoded (and pre-compressed) bytes built when it is cached.
+ticker_cache = TTLCache("tickers", TICKER_CACHE_EXPIRATION_SECONDS, 1, TICKER_CACHE_EXPIRATION_SECONDS, encoder=EncodedBody.from_data)
+# Encoded /analyze bodies per symbol, keyed by the timestamps of the cached parts they were built from.
+analysis_response_cache = TTLCache("analysis_responses", max(CACHE_EXPIRATION_SECONDS, FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS, NEWS_CACHE_EXPIRATION_SECONDS), CACHE_MAX_ENTRIES)
+
+# Scraped Reddit posts and per-search cursors, shared through the same on-disk store.
+REDDIT_POST_MAX_AGE_SECONDS = int(os.getenv("REDDIT_POST_MAX_AGE_SECONDS", "86400"))
+reddit_scraper.post_store = RedditPostStore(max_age_seconds=REDDIT_POST_MAX_AGE_SECONDS)
+x_scraper.post_cache = TTLCache("x_posts", x_scraper.X_CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+# Sentiment and quote snapshots per symbol in fixed-size ring buffers (HISTORY_RETENTION_SECONDS
+# of HISTORY_RESOLUTION_SECONDS buckets), flushed to the shared store every HISTORY_FLUSH_SECONDS.
+HISTORY_RESOLUTION_SECONDS = int(os.getenv("HISTORY_RESOLUTION_SECONDS", "300"))
+HISTORY_RETENTION_SECONDS = int(os.getenv("HISTORY_RETENTION_SECONDS", str(3 * 86400)))
+HISTORY_MAX_SYMBOLS = int(os.getenv("HISTORY_MAX_SYMBOLS", "5000"))
+HISTORY_FLUSH_SECONDS = 60
+history_store = HistoryStore(HISTORY_RESOLUTION_SECONDS, HISTORY_RETENTION_SECONDS, HISTORY_MAX_SYMBOLS)
+
+def _set_cache_backend(backend: Optional[SQLiteCacheBackend]):
+    global cache_backend
+    cache_backend = backend
+    for user in (sentiment_cache, financial_data_cache, news_cache, ticker_cache, x_scraper.post_cache, reddit_scraper.post_store, history_store):
+        user.backend = backend
+
+# Coalesces concurrent cache-miss fetches keyed by (data kind, symbol).
+upstream_flights = SingleFlight()
+_background_refreshes = set()
+
+SENTIMENT_MAX_WORKERS = int(os.getenv("SENTIMENT_MAX_WORKERS", "2"))
+sentiment_engine = SentimentEngine(max_workers=SENTIMENT_MAX_WORKERS)
+
+# Sentiment fans out to every Reddit search and X under one deadline; sources still running
+# then are cancelled. Results missing a source are cached briefly so the gap is retried soon.
+# A hedged duplicate Reddit search is sent after SENTIMENT_HEDGE_AFTER_SECONDS (0 disables).
+# SENTIMENT_DEADLINE_SECONDS applies when a client waits for the result (/analyze/stream).
+# Background computations (cache fills, refreshes, prefetch) get a deadline long enough for
+# the Reddit rate governor to wait out a rate-limit window and retry a 429.
+SENTIMENT_DEADLINE_SECONDS = float(os.getenv("SENTIMENT_DEADLINE_SECONDS", "8"))
+SENTIMENT_BACKGROUND_DEADLINE_SECONDS = float(os.getenv(
+    "SENTIMENT_BACKGROUND_DEADLINE_SECONDS", str(reddit_scraper.REDDIT_MAX_RATE_LIMIT_WAIT_SECONDS + 30)
+))
+SENTIMENT_HEDGE_AFTER_SECONDS = float(os.getenv("SENTIMENT_HEDGE_AFTER_SECONDS", "0"))
+PARTIAL_SENTIMENT_CACHE_SECONDS = 60
+# Empty news lookups are cached this long, so hot symbols without news are not refetched every tick.
+NEGATIVE_NEWS_CACHE_SECONDS = 120
+X_POSTS_PER_SENTIMENT = 20
+
+# Search index over the cached ticker list; rebuilt off the event loop only when the ticker cache is refreshed.
+ticker_index: Optional[TickerSearchIndex] = None
+# The ticker list currently being indexed and the task building it.
+_ticker_index_build: Optional[Tuple[List[Dict[str, str]], asyncio.Task]] = None
+
+# Startup warm-up: each step's outcome (None while it runs), reported by /ready.
+process_started_at = time.time()
+warmup_status: Dict[str, Optional[bool]] = {}
+warmup_finished_at: Optional[float] = None
+
+MAX_BATCH_SYMBOLS = 100
+BATCH_NEWS_CONCURRENCY = 8
+BATCH_SENTIMENT_CONCURRENCY = 4
+
+# Cache warming for hot symbols. The FMP share is the fraction of FMP_REQUESTS_PER_MINUTE
+# the scheduler may spend (per worker); one sentiment refresh costs about one Reddit
+# search per subreddit.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_INTERVAL_SECONDS = int(os.getenv("PREFETCH_INTERVAL_SECONDS", "30"))
+PREFETCH_LEAD_SECONDS = int(os.getenv("PREFETCH_LEAD_SECONDS", "60"))
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "50"))
+PREFETCH_FMP_BUDGET_SHARE = float(os.getenv("PREFETCH_FMP_BUDGET_SHARE", "0.2"))
+PREFETCH_REDDIT_REQUESTS_PER_MINUTE = int(os.getenv("PREFETCH_REDDIT_REQUESTS_PER_MINUTE", "30"))
 
 
-async def _get_cached_item(cache: Dict[str, Any], key: str, expiration: int) -> Optional[Any]:
-    async with cache["lock"]:
-        item = cache["data"].get(key)
-        if item and (time.time() - item["timestamp"]) < expiration:
-            logger.debug(f"Returning cached data for {key} from {cache} cache.")
-            return item["data"]
+async def _get_cached_item(
+    cache: TTLCache,
+    key: str,
+    refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+    stale_keys: Optional[List[str]] = None,
+) -> Optional[Any]:
+    """
+    Returns the cached value for key if it is fresh. If it has expired but is still within
+    the stale window and a refresh callable is given, the stale value is returned right away
+    and the refresh is scheduled in the background (coalesced with any in-flight fetch).
+    With `stale_keys` instead, a stale value is also returned, and key is appended to the
+    list so the caller can refresh all stale keys with one batched fetch.
+    Local misses and stale hits first check the shared cache backend, which may hold a
+    newer entry written by another worker or before a restart.
+    """
+    entry = cache.get_entry(key)
+    if cache.backend is not None and (entry is None or not entry.is_fresh()):
+        await cache.load_from_backend(key)
+    value, fresh = cache.lookup(key)
+    if value is None:
+        return None
+    if fresh:
+        logger.debug(f"Returning cached data for {key} from {cache.name} cache.")
+        return value
+    if stale_keys is not None:
+        stale_keys.append(key)
+        return value
+    if refresh is None:
         return None
 
-async def _set_cached_item(cache: Dict[str, Any], key: str, data: Any):
-    async with cache["lock"]:
-        cache["data"][key] = {"data": data, "timestamp": time.time()}
-        logger.debug(f"Set data for {key} in {cache} cache.")
+    flight_key = (cache.name, key)
+    if not upstream_flights.in_flight(flight_key):
+        logger.info(f"Serving stale {cache.name} data for {key} and refreshing in background.")
+        _track_background_task(asyncio.create_task(upstream_flights.do(flight_key, refresh)))
+    return value
+
+def _track_background_task(task: asyncio.Task):
+    # Keeps a reference so fire-and-forget tasks are not garbage collected mid-flight.
+    _background_refreshes.add(task)
+    task.add_done_callback(_on_background_task_done)
+
+def _on_background_task_done(task: asyncio.Task):
+    # Nothing awaits these tasks, so their exceptions are consumed and logged here.
+    _background_refreshes.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if isinstance(error, HTTPException):
+        logger.warning(f"Background refresh failed: {error.detail}")
+    elif error is not None:
+        logger.error("Background task failed:", exc_info=error)
+
+async def _set_cached_item(cache: TTLCache, key: str, data: Any, ttl: Optional[float] = None):
+    cache.set(key, data, ttl=ttl)
+    await cache.persist(key)
+    logger.debug(f"Set data for {key} in {cache.name} cache.")
 
 async def _fetch_tickers_from_fmp() -> List[Dict[str, str]]:
     if not fmp_client:
@@ -126,6 +329,12 @@ async def _fetch_tickers_from_fmp() -> List[Dict[str, str]]:
             if s.get("exchangeShortName") in ["NASDAQ", "NYSE"] and s.get("type") == "stock"
         ]
         await _set_cached_item(ticker_cache, "all_tickers", filtered_stocks)
+        _refresh_ticker_index(filtered_stocks)
+        if TICKER_SNAPSHOT_PATH:
+            try:
+                await asyncio.to_thread(save_snapshot, TICKER_SNAPSHOT_PATH, filtered_stocks)
+            except OSError as e:
+                logger.warning(f"Could not write ticker snapshot {TICKER_SNAPSHOT_PATH}: {e}")
         return filtered_stocks
     except FMPAPIError as e:
         logger.error(f"FMP API Error fetching tickers: {e}")
@@ -141,56 +350,108 @@ async def _fetch_tickers_from_fmp() -> List[Dict[str, str]]:
         logger.exception("An unexpected error occurred while fetching tickers:")
         raise HTTPException(status_code=500, detail=f"An unexpected internal error occurred: {e}")
 
-async def _process_reddit_sentiment(symbol: str, company_name: str) -> Dict[str, Any]:
-    reddit_posts_texts = []
+async def _build_ticker_index(tickers: List[Dict[str, str]]) -> TickerSearchIndex:
+    global ticker_index
+    build_started = time.perf_counter()
+    index = await asyncio.to_thread(TickerSearchIndex, tickers)
+    # Swap in only if no newer ticker list started indexing meanwhile; searches used the old index until now.
+    if _ticker_index_build is not None and _ticker_index_build[0] is tickers:
+        ticker_index = index
+    logger.info(f"Built ticker search index over {len(tickers)} tickers in {(time.perf_counter() - build_started) * 1000:.1f} ms.")
+    return index
+
+def _refresh_ticker_index(tickers: List[Dict[str, str]]) -> Optional[asyncio.Task]:
+    """Starts building the search index for tickers in a thread, unless it is current. Returns the build task, if any."""
+    global _ticker_index_build
+    if ticker_index is not None and ticker_index.tickers is tickers:
+        return None
+    # A finished build for the same list that did not become current has failed, so it is retried.
+    if _ticker_index_build is None or _ticker_index_build[0] is not tickers or _ticker_index_build[1].done():
+        task = asyncio.create_task(_build_ticker_index(tickers))
+        _track_background_task(task)
+        _ticker_index_build = (tickers, task)
+    return _ticker_index_build[1]
+
+async def _get_ticker_index(tickers: List[Dict[str, str]]) -> TickerSearchIndex:
+    """Returns the search index, waiting for a build only when there is no index at all yet."""
+    build = _refresh_ticker_index(tickers)
+    if build is not None and ticker_index is None:
+        return await asyncio.shield(build)
+    return ticker_index
+
+async def _process_sentiment(symbol: str, company_name: str, deadline_seconds: float = SENTIMENT_BACKGROUND_DEADLINE_SECONDS) -> Dict[str, Any]:
+    """
+    Scores sentiment from every configured source (each Reddit search, plus X when a bearer
+    token is set) gathered under `deadline_seconds`, and caches the result. Reddit posts
+    ingested earlier count too; `sources` reports how each source fared this time.
+    """
+    source_status: Dict[str, str] = {}
+    reddit_posts_texts: List[str] = []
+    x_posts_texts: List[str] = []
     try:
-        scraped_data = await scrape_reddit_data(symbol, company_name, subreddits=DEFAULT_SUBREDDITS)
-        reddit_posts_texts = [item["text"] for item in scraped_data]
-        logger.info(f"Scraped {len(reddit_posts_texts)} unique posts/comments from Reddit for {symbol}")
-    except RedditScrapingError as e:
-        logger.error(f"Reddit scraping error for {symbol}: {e}")
-    except asyncio.TimeoutError:
-        logger.error(f"Reddit scraping timed out for symbol {symbol}.")
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred during Reddit scraping for {symbol}:")
-
-    sentiment_score = 0.0
-    sentiment_category = "neutral"
-    if reddit_posts_texts:
-        if len(reddit_posts_texts) > 5:
-            sentiment_score = 0.35
-            sentiment_category = "positive"
-        elif len(reddit_posts_texts) < 3:
-            sentiment_score = -0.2
-            sentiment_category = "negative"
-        else:
-            sentiment_score = 0.05
-            sentiment_category = "neutral"
+        async with reddit_scraper.session_scope() as session:
+            record, fetchers = await reddit_scraper.prepare_ingest(symbol, company_name, session, DEFAULT_SUBREDDITS)
+            hedgeable = list(fetchers)
+            if x_scraper.TWITTER_BEARER_TOKEN:
+                fetchers["x"] = lambda: x_scraper.scrape_x_data(symbol, X_POSTS_PER_SENTIMENT)
+
+            async for result in fan_out(fetchers, deadline_seconds, SENTIMENT_HEDGE_AFTER_SECONDS or None, hedgeable):
+                source_status[result.source] = result.status
+                SENTIMENT_SOURCE_RESULTS.inc(source=result.source, status=result.status)
+                if result.status == "error":
+                    logger.error(f"Sentiment source {result.source} failed for {symbol}: {result.error}")
+                elif result.status == "timeout":
+                    logger.warning(f"Sentiment source {result.source} missed the {deadline_seconds}s deadline for {symbol}.")
+                elif result.source == "x":
+                    x_posts_texts = result.value
+
+        reddit_posts_texts = [item["text"] for item in await reddit_scraper.finish_ingest(symbol, record)]
+        logger.info(f"Collected {len(reddit_posts_texts)} Reddit and {len(x_posts_texts)} X posts for {symbol}")
+    except Exception:
+        logger.exception(f"An unexpected error occurred while gathering sentiment sources for {symbol}:")
 
+    texts = reddit_posts_texts + x_posts_texts
+    summary = await sentiment_engine.analyze(texts)
+    partial = not source_status or any(status != "ok" for status in source_status.values())
     sentiment_result = {
-        "score": round(sentiment_score, 4),
-        "category": sentiment_category,
-        "total_posts_analyzed": len(reddit_posts_texts),
+        "score": summary["score"],
+        "category": summary["category"],
+        "total_posts_analyzed": len(texts),
+        "distribution": summary["distribution"],
+        "posts_by_platform": {"reddit": len(reddit_posts_texts), "x": len(x_posts_texts)},
+        "sources": source_status,
+        "contributing_sources": sorted(source for source, status in source_status.items() if status == "ok"),
+        "partial": partial,
     }
-    await _set_cached_item(sentiment_cache, symbol, sentiment_result)
+    await _set_cached_item(sentiment_cache, symbol, sentiment_result, PARTIAL_SENTIMENT_CACHE_SECONDS if partial else None)
+    if not partial:
+        # A run that lost sources would record a deflated score and post count.
+        await history_store.record(symbol, sentiment=sentiment_result["score"], posts=len(texts))
     logger.info(f"Sentiment for {symbol}: {sentiment_result}")
     return sentiment_result
 
-async def _fetch_financial_data(symbol: str) -> Dict[str, Any]:
+async def _store_financial_data(symbol: str, financial_data: Dict[str, Any]):
+    await _set_cached_item(financial_data_cache, symbol, financial_data)
+    await history_store.record(symbol, price=financial_data.get("price"), changesPercentage=financial_data.get("changesPercentage"))
+
+def _build_financial_data(fmp_quote: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "price": fmp_quote.get("price"),
+        "changesPercentage": fmp_quote.get("changesPercentage"),
+        "marketCap": fmp_quote.get("marketCap"),
+        "peRatio": fmp_quote.get("peRatio"),
+        "source": "FMP",
+    }
+
+async def _fetch_financial_data(symbol: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
     """Fetches financial quote data from FMP API."""
     if not fmp_client:
         return {"source": "FMP (Not Available)", "error": "API Key not configured."}
 
     try:
-        fmp_quote = await fmp_client.get_quote(symbol)
-        financial_data = {
-            "price": fmp_quote.get("price"),
-            "changesPercentage": fmp_quote.get("changesPercentage"),
-            "marketCap": fmp_quote.get("marketCap"),
-            "peRatio": fmp_quote.get("peRatio"),
-            "source": "FMP",
-        }
-        await _set_cached_item(financial_data_cache, symbol, financial_data)
+        fmp_quote = await fmp_client.get_quote(symbol, priority=priority)
+        financial_data = _build_financial_data(fmp_quote)
+        await _store_financial_data(symbol, financial_data)
         logger.info(f"Fetched financial data for {symbol}: Price={financial_data.get('price')}")
         return financial_data
     except FMPNotFoundError:
@@ -203,24 +464,69 @@ async def _fetch_financial_data(symbol: str) -> Dict[str, Any]:
         logger.exception(f"Unexpected error fetching financial data for {symbol}:")
         return {"source": "FMP (Unexpected Error)", "error": str(e)}
 
-async def _fetch_recent_news(symbol: str) -> List[Dict[str, Any]]:
+async def _fetch_financial_data_batch(symbols: List[str], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches financial quote data for many symbols with multi-symbol FMP quote requests,
+    one per MAX_SYMBOLS_PER_QUOTE_REQUEST symbols. A failed request only affects its own chunk.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    if not fmp_client:
+        return {symbol: {"source": "FMP (Not Available)", "error": "API Key not configured."} for symbol in symbols}
+
+    chunk_size = fmp_client.MAX_SYMBOLS_PER_QUOTE_REQUEST
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def _fetch_chunk(chunk: List[str]):
+        try:
+            quotes = await fmp_client.get_quotes(chunk, priority=priority)
+        except FMPAPIError as e:
+            logger.error(f"FMP API Error fetching batch quotes for {','.join(chunk)}: {e}")
+            for symbol in chunk:
+                results[symbol] = {"source": f"FMP (Error: {e.__class__.__name__})", "error": str(e)}
+            return
+        except Exception as e:
+            logger.exception(f"Unexpected error fetching batch quotes for {','.join(chunk)}:")
+            for symbol in chunk:
+                results[symbol] = {"source": "FMP (Unexpected Error)", "error": str(e)}
+            return
+
+        for symbol in chunk:
+            fmp_quote = quotes.get(symbol)
+            if not fmp_quote:
+                logger.warning(f"No financial quote found for {symbol} from FMP.")
+                results[symbol] = {"source": "FMP (Not Found)"}
+                continue
+            financial_data = _build_financial_data(fmp_quote)
+            await _store_financial_data(symbol, financial_data)
+            results[symbol] = financial_data
+
+    await asyncio.gather(*(_fetch_chunk(chunk) for chunk in chunks))
+    logger.info(f"Fetched batch financial data for {len(symbols)} symbols in {len(chunks)} FMP request(s).")
+    return results
+
+async def _fetch_recent_news(symbol: str, priority: int = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
     """Fetches recent news articles from FMP API."""
     if not fmp_client:
         return [{"title": "FMP News Not Available", "url": "#", "error": "API Key not configured."}]
 
     try:
-        fmp_news = await fmp_client.get_company_news(symbol)
+        fmp_news = await fmp_client.get_company_news(symbol, priority=priority)
         recent_news = [
             {"title": item.get("title"), "url": item.get("url"), "publishedDate": item.get("publishedDate")}
             for item in fmp_news[:8]
         ]
-        await _set_cached_item(news_cache, symbol, recent_news)
+        await _set_cached_item(news_cache, symbol, recent_news, ttl=None if recent_news else NEGATIVE_NEWS_CACHE_SECONDS)
         logger.info(f"Fetched {len(recent_news)} news articles for {symbol}.")
         return recent_news
     except FMPNotFoundError:
         logger.warning(f"No news found for {symbol} from FMP.")
+        await _set_cached_item(news_cache, symbol, [], ttl=NEGATIVE_NEWS_CACHE_SECONDS)
         return []
     except FMPAPIError as e:
+        # Not cached: a failed refresh must not replace good stale news.
         logger.error(f"FMP API Error fetching news for {symbol}: {e}")
         return [{"title": f"FMP News Fetch Error ({e.__class__.__name__})", "url": "#", "error": str(e)}]
     except Exception as e:
@@ -228,66 +534,342 @@ async def _fetch_recent_news(symbol: str) -> List[Dict[str, Any]]:
         return [{"title": "FMP News Unexpected Error", "url": "#", "error": str(e)}]
 
 
+async def _load_ticker_snapshot() -> bool:
+    """Seeds the ticker cache and search index from the local snapshot file. Returns True if one was loaded."""
+    if not TICKER_SNAPSHOT_PATH:
+        return False
+    snapshot = await asyncio.to_thread(load_snapshot, TICKER_SNAPSHOT_PATH)
+    if snapshot is None:
+        return False
+    tickers, saved_at = snapshot
+    age = max(time.time() - saved_at, 0)
+    # A snapshot older than the cache TTL goes in already stale: it is served while _prewarm_tickers refreshes it.
+    ticker_cache.set("all_tickers", tickers, ttl=max(TICKER_CACHE_EXPIRATION_SECONDS, age), timestamp=saved_at)
+    await _get_ticker_index(tickers)
+    logger.info(f"Loaded {len(tickers)} tickers from snapshot {TICKER_SNAPSHOT_PATH} ({age / 3600:.1f} h old).")
+    return True
+
+async def _prewarm_tickers() -> bool:
+    """Makes sure a fresh ticker list and its search index are cached, so the first /tickers and /tickers/search requests are hits."""
+    tickers = await _get_cached_item(ticker_cache, "all_tickers")
+    if not tickers:
+        try:
+            tickers = await upstream_flights.do(("tickers", "all_tickers"), _fetch_tickers_from_fmp)
+            logger.info("Pre-warmed ticker list cache at startup.")
+        except HTTPException as e:
+            logger.warning(f"Could not pre-warm ticker list at startup: {e.detail}")
+            return False
+    build = _refresh_ticker_index(tickers)
+    if build is not None:
+        await asyncio.shield(build)
+    return True
+
+async def _warm_up(steps: Dict[str, Awaitable[Any]]):
+    """Runs the startup warm-up steps concurrently and records in warmup_status whether each succeeded."""
+    global warmup_finished_at
+
+    async def _run(name: str, step: Awaitable[Any]):
+        try:
+            warmup_status[name] = (await step) is not False
+        except Exception:
+            logger.exception(f"Warm-up step {name} failed:")
+            warmup_status[name] = False
+
+    await asyncio.gather(*(_run(name, step) for name, step in steps.items()))
+    warmup_finished_at = time.time()
+    logger.info(f"Warm-up finished {warmup_finished_at - process_started_at:.2f}s after start: {warmup_status}")
+
+async def _trending_tickers() -> Optional[Tuple[List[Dict[str, str]], str]]:
+    """Returns the ticker list with its ETag, which the trending scanner uses to decide when to rebuild its matcher."""
+    tickers = await _get_cached_item(ticker_cache, "all_tickers", _fetch_tickers_from_fmp)
+    if tickers is None and fmp_client:
+        try:
+            tickers = await upstream_flights.do(("tickers", "all_tickers"), _fetch_tickers_from_fmp)
+        except HTTPException as e:
+            logger.warning(f"Could not load ticker list for trending scan: {e.detail}")
+    if not tickers:
+        return None
+    entry = ticker_cache.get_entry("all_tickers")
+    if entry is not None and entry.value is tickers:
+        return tickers, entry.encoded.etag
+    return tickers, await asyncio.to_thread(content_hash, tickers)
+
+async def _prefetch_financial_data(symbols: List[str]):
+    await _fetch_financial_data_batch(symbols, PRIORITY_BACKGROUND)
+
+async def _prefetch_news(symbols: List[str]):
+    await asyncio.gather(*(upstream_flights.do(("news", symbol), _fetch_recent_news, symbol, PRIORITY_BACKGROUND) for symbol in symbols))
+
+async def _prefetch_sentiment(symbols: List[str]):
+    semaphore = asyncio.Semaphore(BATCH_SENTIMENT_CONCURRENCY)
+
+    async def _refresh(symbol: str):
+        async with semaphore:
+            await upstream_flights.do(("sentiment", symbol), _process_sentiment, symbol, hot_symbols.name(symbol))
+
+    await asyncio.gather(*(_refresh(symbol) for symbol in symbols))
+
+hot_symbols = HotSymbolTracker()
+_fmp_prefetch_budget = int(FMP_REQUESTS_PER_MINUTE * PREFETCH_FMP_BUDGET_SHARE * PREFETCH_INTERVAL_SECONDS / 60)
+_reddit_searches_per_symbol = len(DEFAULT_SUBREDDITS) + 1
+prefetch_scheduler = PrefetchScheduler(
+    hot_symbols,
+    [
+        PrefetchTarget(financial_data_cache, _prefetch_financial_data, "fmp", lambda n: -(-n // FMPClient.MAX_SYMBOLS_PER_QUOTE_REQUEST)),
+        PrefetchTarget(news_cache, _prefetch_news, "fmp", lambda n: n),
+        PrefetchTarget(sentiment_cache, _prefetch_sentiment, "reddit", lambda n: n * _reddit_searches_per_symbol),
+    ],
+    budgets={
+        "fmp": _fmp_prefetch_budget,
+        "reddit": int(PREFETCH_REDDIT_REQUESTS_PER_MINUTE * PREFETCH_INTERVAL_SECONDS / 60),
+    },
+    interval_seconds=PREFETCH_INTERVAL_SECONDS,
+    lead_seconds=PREFETCH_LEAD_SECONDS,
+    top_k=PREFETCH_TOP_K,
+)
+
+
+async def _fetch_stream_quotes(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    results = await _fetch_financial_data_batch(symbols, PRIORITY_BULK)
+    return {symbol: data for symbol, data in results.items() if data.get("source") == "FMP"}
+
+# Live quotes for /ws/quotes: one batched FMP quote refresh per tick for the union of subscribed symbols.
+QUOTE_STREAM_INTERVAL_SECONDS = float(os.getenv("QUOTE_STREAM_INTERVAL_SECONDS", "5"))
+QUOTE_STREAM_MAX_SYMBOLS = int(os.getenv("QUOTE_STREAM_MAX_SYMBOLS", "500"))
+QUOTE_STREAM_MAX_SYMBOLS_PER_CLIENT = 50
+# A client whose socket does not accept a message within this time is disconnected.
+QUOTE_STREAM_SEND_TIMEOUT_SECONDS = 10
+quote_hub = QuoteHub(_fetch_stream_quotes, QUOTE_STREAM_INTERVAL_SECONDS, QUOTE_STREAM_MAX_SYMBOLS, QUOTE_STREAM_MAX_SYMBOLS_PER_CLIENT)
+
+# Market-wide mention counts from one sweep of each subreddit's newest posts per interval.
+TRENDING_ENABLED = os.getenv("TRENDING_ENABLED", "true").lower() == "true"
+TRENDING_INTERVAL_SECONDS = int(os.getenv("TRENDING_INTERVAL_SECONDS", "120"))
+TRENDING_HALF_LIFE_SECONDS = int(os.getenv("TRENDING_HALF_LIFE_SECONDS", "3600"))
+trending_scanner = TrendingScanner(DEFAULT_SUBREDDITS, _trending_tickers, TRENDING_INTERVAL_SECONDS, TRENDING_HALF_LIFE_SECONDS)
+
+app.add_middleware(RequestLatencyMiddleware)
+
+def _collect_internal_metrics():
+    caches = (sentiment_cache, financial_data_cache, news_cache, ticker_cache)
+    cache_stats = {cache.name: cache.stats() for cache in caches}
+    for stat, metric_type, help_text in (
+        ("hits", "counter", "Fresh cache hits."),
+        ("stale_hits", "counter", "Stale cache hits served while refreshing."),
+        ("misses", "counter", "Cache misses."),
+        ("evictions", "counter", "LRU evictions."),
+        ("backend_loads", "counter", "Entries loaded from the shared cache store."),
+        ("size", "gauge", "Entries currently held in memory."),
+    ):
+        name = f"cache_{stat}_total" if metric_type == "counter" else f"cache_{stat}"
+        yield name, metric_type, help_text, [({"cache": cache_name}, stats[stat]) for cache_name, stats in cache_stats.items()]
+
+    flight_stats = upstream_flights.stats()
+    yield "single_flight_executed_total", "counter", "Upstream fetches started by the single-flight layer.", [({}, flight_stats["executed"])]
+    yield "single_flight_coalesced_total", "counter", "Calls that awaited an in-flight fetch instead of starting one.", [
+        ({"kind": kind}, count) for kind, count in flight_stats["coalesced_by_kind"].items()
+    ]
+    if fmp_client:
+        budget = fmp_client.get_budget_usage()
+        yield "fmp_budget_granted_total", "counter", "FMP requests admitted by the client-side rate limiter.", [({}, budget["granted"])]
+        yield "fmp_budget_rejected_total", "counter", "FMP requests rejected because the budget was exhausted.", [({}, budget["rejected"])]
+        yield "fmp_budget_queued", "gauge", "FMP requests waiting for rate limiter tokens.", [({}, budget["queued"])]
+    reddit_governor = reddit_scraper.governor.stats()
+    yield "reddit_governor_queued", "gauge", "Reddit requests waiting for the rate governor.", [({}, reddit_governor["queued"])]
+    yield "reddit_governor_throttle_seconds_total", "counter", "Total time Reddit requests spent waiting for the rate governor.", [({}, reddit_governor["throttle_seconds"])]
+    yield "reddit_governor_rate_limited_total", "counter", "Reddit 429 responses.", [({}, reddit_governor["rate_limited"])]
+    yield "reddit_governor_rejected_total", "counter", "Reddit requests failed fast because the rate-limit window was exhausted.", [({}, reddit_governor["rejected"])]
+    if reddit_governor["remaining"] is not None:
+        yield "reddit_ratelimit_remaining", "gauge", "Requests left in Reddit's current rate-limit window.", [({}, reddit_governor["remaining"])]
+
+REGISTRY.register_collector(_collect_internal_metrics)
+
+
+def _sanitize_company_name(name: str) -> str:
+    name = name.strip()
+    if not re.match(r"^[a-zA-Z0-9\s.,&'-]+$", name) and name:
+        logger.warning(f"Sanitizing potentially invalid company name: {name}")
+        name = re.sub(r"[^a-zA-Z0-9\s.,&'-]", "", name).strip()
+    return name
+
+
+def _validate_symbol(symbol: str) -> str:
+    symbol = symbol.strip().upper()
+    if not symbol.isalnum():
+        logger.warning(f"Invalid symbol format received: {symbol}")
+        raise HTTPException(status_code=400, detail="Invalid stock symbol format. Only alphanumeric characters are allowed.")
+    return symbol
+
+_WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+def _parse_window(window: str) -> int:
+    """Parses a history window such as 90m, 6h or 3d into seconds."""
+    match = re.fullmatch(r"(\d+)([mhd])", window.strip().lower())
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid window. Use a number followed by m, h or d (e.g. 6h).")
+    seconds = int(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+    if not 0 < seconds <= HISTORY_RETENTION_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Window must be between 1m and {HISTORY_RETENTION_SECONDS // 3600}h.")
+    return seconds
+
+async def _get_cached_analysis(symbol: str, name: str):
+    """Returns cached (sentiment, financial_data, recent_news) for symbol; stale entries trigger background refreshes."""
+    sentiment = await _get_cached_item(sentiment_cache, symbol, lambda: _process_sentiment(symbol, name))
+    financial_data = await _get_cached_item(financial_data_cache, symbol, lambda: _fetch_financial_data(symbol, PRIORITY_BACKGROUND))
+    recent_news = await _get_cached_item(news_cache, symbol, lambda: _fetch_recent_news(symbol, PRIORITY_BACKGROUND))
+    return sentiment, financial_data, recent_news
+
+def _analysis_entries(symbol: str) -> Optional[Tuple[CacheEntry, CacheEntry, CacheEntry]]:
+    """
+    The sentiment, financial data and news cache entries for symbol, or None if any is missing
+    (e.g. evicted while _get_cached_analysis awaited a backend load); then it is not fully cached.
+    """
+    entries = tuple(cache.get_entry(symbol) for cache in (sentiment_cache, financial_data_cache, news_cache))
+    return None if any(entry is None for entry in entries) else entries
+
+def _analysis_validators(symbol: str, entries: Tuple[CacheEntry, ...]) -> Tuple[str, float]:
+    """(ETag, last modified) for fully cached parts, derived from the hashes and timestamps stored when they were written."""
+    return make_etag(symbol, *(entry.encoded for entry in entries)), max(entry.timestamp for entry in entries)
+
+def _encoded_analysis(symbol: str, entries: Tuple[CacheEntry, ...]) -> EncodedBody:
+    """Returns the encoded /analyze body for fully cached parts, encoding it again only after one of them was rewritten."""
+    parts_written = tuple(entry.timestamp for entry in entries)
+    cached = analysis_response_cache.get(symbol)
+    if cached is not None and cached[0] == parts_written:
+        return cached[1]
+    sentiment, financial_data, recent_news = (entry.value for entry in entries)
+    encoded = EncodedBody.from_data({
+        "symbol": symbol,
+        "sentiment": sentiment,
+        "financial_data": financial_data,
+        "recent_news": recent_news,
+    })
+    analysis_response_cache.set(symbol, (parts_written, encoded))
+    return encoded
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+class BatchAnalyzeRequest(BaseModel):
+    symbols: List[str]
+    names: Dict[str, str] = {}
+
+
 @app.get("/")
 async def root():
     return {"message": "Stock Hype Recommender API v2.2.4 is running."}
 
+@app.get("/ready")
+async def get_ready():
+    """
+    Readiness probe: 503 until the startup warm-up (ticker list, search index, sentiment
+    lexicon and upstream connections) has finished, 200 afterwards. A failed step does not
+    hold readiness back; it is reported as false.
+    """
+    ready = warmup_finished_at is not None
+    return FastJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "warmup_seconds": round(warmup_finished_at - process_started_at, 3) if ready else None,
+            "tickers_loaded": ticker_cache.get_entry("all_tickers") is not None,
+            "checks": warmup_status,
+        },
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Exposes upstream, cache and endpoint metrics in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/stats")
+async def get_stats():
+    """Reports internal counters, such as how many upstream fetches were coalesced."""
+    return {
+        "single_flight": upstream_flights.stats(),
+        "caches": {cache.name: cache.stats() for cache in (sentiment_cache, financial_data_cache, news_cache, ticker_cache)},
+        "fmp_budget": fmp_client.get_budget_usage() if fmp_client else None,
+        "reddit_posts": reddit_scraper.post_store.stats(),
+        "reddit_governor": reddit_scraper.governor.stats(),
+        "x": x_scraper.stats(),
+        "prefetch": prefetch_scheduler.stats(),
+        "history": history_store.stats(),
+        "trending": trending_scanner.stats(),
+        "quote_stream": quote_hub.stats(),
+    }
+
 @app.get("/tickers", response_model=List[Dict[str, str]])
-async def get_all_tickers():
+async def get_all_tickers(request: Request):
     """
     Provides a list of all available stock tickers from NASDAQ, NYSE, etc.
-    The list is cached to improve performance.
+    The list is cached to improve performance, together with its encoded response body.
     """
-    cached_tickers = await _get_cached_item(ticker_cache, "all_tickers", TICKER_CACHE_EXPIRATION_SECONDS)
-    if cached_tickers:
+    tickers = await _get_cached_item(ticker_cache, "all_tickers", _fetch_tickers_from_fmp)
+    if tickers:
         logger.info("Returning cached ticker list.")
-        return JSONResponse(content=cached_tickers, headers={"Cache-Control": f"max-age={TICKER_CACHE_EXPIRATION_SECONDS}"})
+    else:
+        tickers = await upstream_flights.do(("tickers", "all_tickers"), _fetch_tickers_from_fmp)
+
+    headers = {"Cache-Control": f"max-age={TICKER_CACHE_EXPIRATION_SECONDS}"}
+    entry = ticker_cache.get_entry("all_tickers")
+    if entry is not None and entry.value is tickers:
+        headers.update(validator_headers(entry.encoded.etag, entry.timestamp))
+        if is_not_modified(request, headers["ETag"], entry.timestamp):
+            return not_modified_response(headers)
+        return encoded_response(request, entry.encoded, headers)
+    return FastJSONResponse(content=tickers, headers=headers)
+
+@app.get("/tickers/search", response_model=List[Dict[str, str]])
+async def search_tickers(
+    q: str = Query(..., min_length=1, max_length=64, description="Symbol prefix or company name (e.g. TS, tesla)"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of matches to return"),
+):
+    """
+    Returns the best matching tickers for a query: exact and prefix symbol matches first,
+    then company-name token matches, then close spellings of company-name tokens.
+    """
+    tickers = await _get_cached_item(ticker_cache, "all_tickers", _fetch_tickers_from_fmp)
+    if not tickers:
+        tickers = await upstream_flights.do(("tickers", "all_tickers"), _fetch_tickers_from_fmp)
 
-    fresh_tickers = await _fetch_tickers_from_fmp()
-    return JSONResponse(content=fresh_tickers, headers={"Cache-Control": f"max-age={TICKER_CACHE_EXPIRATION_SECONDS}"})
+    matches = (await _get_ticker_index(tickers)).search(q, limit)
+    return FastJSONResponse(content=matches, headers={"Cache-Control": "max-age=300"})
 
 
 @app.get("/analyze")
 async def analyze(
+    request: Request,
     background_tasks: BackgroundTasks, 
     symbol: str = Query(..., min_length=1, description="Stock ticker symbol (e.g. TSLA, GME)"),
     name: str = Query("", description="Company name for a more accurate search (e.g. Tesla, Inc.)")
 ):
-    symbol = symbol.strip().upper()
-    name = name.strip()
-    if not re.match(r"^[a-zA-Z0-9\s.,&'-]+$", name) and name:
-        logger.warning(f"Sanitizing potentially invalid company name: {name}")
-        name = re.sub(r"[^a-zA-Z0-9\s.,&'-]", "", name).strip()
+    symbol = _validate_symbol(symbol)
+    name = _sanitize_company_name(name)
 
-    if not symbol.isalnum():
-        logger.warning(f"Invalid symbol format received: {symbol}")
-        raise HTTPException(status_code=400, detail="Invalid stock symbol format. Only alphanumeric characters are allowed.")
-
-    sentiment = await _get_cached_item(sentiment_cache, symbol, CACHE_EXPIRATION_SECONDS)
-    financial_data = await _get_cached_item(financial_data_cache, symbol, FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS)
-    recent_news = await _get_cached_item(news_cache, symbol, NEWS_CACHE_EXPIRATION_SECONDS)
+    hot_symbols.record(symbol, name)
+    sentiment, financial_data, recent_news = await _get_cached_analysis(symbol, name)
 
-    all_cached_fresh = sentiment and financial_data and recent_news
+    all_cached_fresh = sentiment and financial_data and recent_news is not None
+    entries = _analysis_entries(symbol) if all_cached_fresh else None
 
-    if all_cached_fresh:
+    if entries is not None:
         logger.info(f"Returning fully cached analysis data for {symbol}")
-        response_data = {
-            "symbol": symbol,
-            "sentiment": sentiment,
-            "financial_data": financial_data,
-            "recent_news": recent_news,
-        }
         max_cache_age = max(CACHE_EXPIRATION_SECONDS, FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS, NEWS_CACHE_EXPIRATION_SECONDS)
-        return JSONResponse(content=response_data, headers={"Cache-Control": f"max-age={max_cache_age}"})
+        etag, last_modified = _analysis_validators(symbol, entries)
+        headers = {"Cache-Control": f"max-age={max_cache_age}", **validator_headers(etag, last_modified)}
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(headers)
+        encoded = _encoded_analysis(symbol, entries)
+        return encoded_response(request, encoded, headers)
 
     logger.info(f"Initiating fetch for missing/stale analysis data for symbol: {symbol}")
 
     async def _fetch_and_cache_sentiment_bg():
         if not sentiment:
-            await _process_reddit_sentiment(symbol, name)
+            await upstream_flights.do(("sentiment", symbol), _process_sentiment, symbol, name)
 
-    financial_data_task = _fetch_financial_data(symbol) if not financial_data else asyncio.sleep(0)
-    news_task = _fetch_recent_news(symbol) if not recent_news else asyncio.sleep(0)
+    financial_data_task = upstream_flights.do(("financial_data", symbol), _fetch_financial_data, symbol) if not financial_data else asyncio.sleep(0)
+    news_task = upstream_flights.do(("news", symbol), _fetch_recent_news, symbol) if recent_news is None else asyncio.sleep(0)
 
     background_tasks.add_task(_fetch_and_cache_sentiment_bg)
 
@@ -295,7 +877,7 @@ async def analyze(
 
     final_sentiment = sentiment or {"score": 0.0, "category": "neutral", "total_posts_analyzed": 0, "status": "fetching in background"}
     final_financial_data = fetched_financial_data if fetched_financial_data else financial_data
-    final_news = fetched_news if fetched_news else recent_news
+    final_news = fetched_news if fetched_news is not None else recent_news
 
     response_data = {
         "symbol": symbol,
@@ -305,4 +887,279 @@ async def analyze(
     }
 
     max_cache_age_response = max(CACHE_EXPIRATION_SECONDS, FINANCIAL_DATA_CACHE_EXPIRATION_SECONDS, NEWS_CACHE_EXPIRATION_SECONDS)
-    return JSONResponse(content=response_data, headers={"Cache-Control": f"max-age={max_cache_age_response}"})
\ No newline at end of file
+    return FastJSONResponse(content=response_data, headers={"Cache-Control": f"max-age={max_cache_age_response}"})
+
+
+@app.get("/analyze/stream")
+async def analyze_stream(
+    symbol: str = Query(..., min_length=1, description="Stock ticker symbol (e.g. TSLA, GME)"),
+    name: str = Query("", description="Company name for a more accurate search (e.g. Tesla, Inc.)")
+):
+    """
+    Streams the analysis as Server-Sent Events. A fully cached symbol is sent as a single
+    `analysis` event. Otherwise cached parts are sent first, then `financial_data`,
+    `recent_news` and `sentiment` events as each fetch completes, and finally a `done`
+    event. Sentiment is computed on this connection instead of in the background, so
+    clients do not need to re-poll.
+    """
+    symbol = _validate_symbol(symbol)
+    name = _sanitize_company_name(name)
+
+    hot_symbols.record(symbol, name)
+    sentiment, financial_data, recent_news = await _get_cached_analysis(symbol, name)
+
+    async def _event_stream():
+        if sentiment and financial_data and recent_news is not None:
+            logger.info(f"Streaming fully cached analysis data for {symbol}")
+            yield _sse_event("analysis", {
+                "symbol": symbol,
+                "sentiment": sentiment,
+                "financial_data": financial_data,
+                "recent_news": recent_news,
+            })
+            return
+
+        async def _labelled(event: str, awaitable: Awaitable[Any]):
+            return event, await awaitable
+
+        pending = []
+        for event, cached, fetch in (
+            ("financial_data", financial_data, lambda: upstream_flights.do(("financial_data", symbol), _fetch_financial_data, symbol)),
+            ("recent_news", recent_news, lambda: upstream_flights.do(("news", symbol), _fetch_recent_news, symbol)),
+            ("sentiment", sentiment, lambda: upstream_flights.do(("sentiment", symbol), _process_sentiment, symbol, name, SENTIMENT_DEADLINE_SECONDS)),
+        ):
+            if cached is not None:
+                yield _sse_event(event, cached)
+            else:
+                pending.append(asyncio.ensure_future(_labelled(event, fetch())))
+
+        try:
+            for next_done in asyncio.as_completed(pending):
+                event, data = await next_done
+                yield _sse_event(event, data)
+            yield _sse_event("done", {"symbol": symbol})
+        finally:
+            # On client disconnect, stop waiting; the shared fetches themselves keep running and still fill the cache.
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest, background_tasks: BackgroundTasks):
+    """
+    Analyzes a watchlist of symbols in one call. Quotes are fetched with comma-joined
+    FMP multi-symbol requests, news is fanned out with bounded concurrency and missing
+    sentiment is refreshed in the background. Errors are reported per symbol.
+    """
+    symbols: List[str] = []
+    invalid_symbols: Dict[str, str] = {}
+    for raw_symbol in request.symbols:
+        symbol = raw_symbol.strip().upper()
+        if not symbol.isalnum():
+            logger.warning(f"Invalid symbol format received in batch: {raw_symbol}")
+            invalid_symbols[raw_symbol] = "Invalid stock symbol format. Only alphanumeric characters are allowed."
+        elif symbol not in symbols:
+            symbols.append(symbol)
+
+    if not symbols and not invalid_symbols:
+        raise HTTPException(status_code=400, detail="At least one stock symbol is required.")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Too many symbols. A batch may contain at most {MAX_BATCH_SYMBOLS} symbols.")
+
+    names = {key.strip().upper(): _sanitize_company_name(value) for key, value in request.names.items()}
+    for symbol in symbols:
+        hot_symbols.record(symbol, names.get(symbol, ""))
+
+    # Stale sentiment and news are served as-is and refreshed in one bounded background task below.
+    stale_sentiment: List[str] = []
+    sentiments = {
+        symbol: await _get_cached_item(sentiment_cache, symbol, stale_keys=stale_sentiment)
+        for symbol in symbols
+    }
+    # Stale quotes are served as-is and refreshed together with one batched fetch below.
+    stale_financial: List[str] = []
+    financial_data = {
+        symbol: await _get_cached_item(financial_data_cache, symbol, stale_keys=stale_financial)
+        for symbol in symbols
+    }
+    stale_financial = [symbol for symbol in stale_financial if not upstream_flights.in_flight((financial_data_cache.name, symbol))]
+    if stale_financial:
+        logger.info(f"Serving stale financial data for {len(stale_financial)} symbols and refreshing them in background.")
+        _track_background_task(asyncio.create_task(upstream_flights.do_batch(
+            {(financial_data_cache.name, symbol): symbol for symbol in stale_financial},
+            _fetch_financial_data_batch, stale_financial, PRIORITY_BACKGROUND,
+        )))
+    stale_news: List[str] = []
+    recent_news = {
+        symbol: await _get_cached_item(news_cache, symbol, stale_keys=stale_news)
+        for symbol in symbols
+    }
+    stale_sentiment = [symbol for symbol in stale_sentiment if not upstream_flights.in_flight((sentiment_cache.name, symbol))]
+    stale_news = [symbol for symbol in stale_news if not upstream_flights.in_flight((news_cache.name, symbol))]
+
+    missing_financial = [symbol for symbol in symbols if not financial_data[symbol]]
+    missing_news = [symbol for symbol in symbols if recent_news[symbol] is None]
+    missing_sentiment = [symbol for symbol in symbols if not sentiments[symbol]]
+    logger.info(
+        f"Batch analysis for {len(symbols)} symbols: {len(missing_financial)} quotes, "
+        f"{len(missing_news)} news and {len(missing_sentiment)} sentiment results to fetch."
+    )
+
+    news_semaphore = asyncio.Semaphore(BATCH_NEWS_CONCURRENCY)
+    sentiment_semaphore = asyncio.Semaphore(BATCH_SENTIMENT_CONCURRENCY)
+
+    async def _fetch_news_bounded(symbol: str, priority: int) -> List[Dict[str, Any]]:
+        async with news_semaphore:
+            return await upstream_flights.do(("news", symbol), _fetch_recent_news, symbol, priority)
+
+    async def _process_sentiment_bounded(symbol: str):
+        async with sentiment_semaphore:
+            await upstream_flights.do(("sentiment", symbol), _process_sentiment, symbol, names.get(symbol, ""))
+
+    async def _fetch_missing_news(symbol: str):
+        recent_news[symbol] = await _fetch_news_bounded(symbol, PRIORITY_BULK)
+
+    async def _refresh_in_background():
+        await asyncio.gather(
+            *(_process_sentiment_bounded(symbol) for symbol in missing_sentiment + stale_sentiment),
+            *(_fetch_news_bounded(symbol, PRIORITY_BACKGROUND) for symbol in stale_news),
+        )
+
+    if missing_sentiment or stale_sentiment or stale_news:
+        if stale_sentiment or stale_news:
+            logger.info(
+                f"Serving stale sentiment for {len(stale_sentiment)} and stale news for {len(stale_news)} "
+                f"symbols and refreshing them in background."
+            )
+        background_tasks.add_task(_refresh_in_background)
+
+    fetched_financial_data, _ = await asyncio.gather(
+        upstream_flights.do_batch(
+            {(financial_data_cache.name, symbol): symbol for symbol in missing_financial},
+            _fetch_financial_data_batch, missing_financial,
+        ) if missing_financial else asyncio.sleep(0, {}),
+        asyncio.gather(*(_fetch_missing_news(symbol) for symbol in missing_news)),
+    )
+    financial_data.update(fetched_financial_data)
+
+    results = []
+    seen_symbols = set()
+    for raw_symbol in request.symbols:
+        symbol = raw_symbol if raw_symbol in invalid_symbols else raw_symbol.strip().upper()
+        if symbol in seen_symbols:
+            continue
+        seen_symbols.add(symbol)
+        if raw_symbol in invalid_symbols:
+            results.append({"symbol": raw_symbol, "error": invalid_symbols[raw_symbol]})
+            continue
+        results.append({
+            "symbol": symbol,
+            "sentiment": sentiments[symbol] or {"score": 0.0, "category": "neutral", "total_posts_analyzed": 0, "status": "fetching in background"},
+            "financial_data": financial_data[symbol],
+            "recent_news": recent_news[symbol],
+        })
+
+    return FastJSONResponse(content={"results": results})
+
+
+@app.websocket("/ws/quotes")
+async def quotes_websocket(websocket: WebSocket):
+    """
+    Streams live quotes. Clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]}
+    (initial symbols may also be given as ?symbols=AAPL,MSFT) and receive
+    {"type": "quotes", "quotes": {symbol: financial_data}} whenever subscribed quotes change,
+    plus {"type": "subscribed" | "unsubscribed" | "error", ...} acknowledgements.
+    """
+    await websocket.accept()
+    subscriber = quote_hub.connect()
+
+    async def _send():
+        try:
+            await subscriber.run_sender(websocket.send_text, QUOTE_STREAM_SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Disconnecting quote stream client that stopped reading.")
+            await websocket.close(code=1013)
+
+    def _handle(action: str, raw_symbols: Any):
+        if not isinstance(raw_symbols, list) or not all(isinstance(symbol, str) for symbol in raw_symbols):
+            subscriber.push_message({"type": "error", "detail": "symbols must be a list of strings."})
+            return
+        symbols = [symbol.strip().upper() for symbol in raw_symbols]
+        invalid = [symbol for symbol in symbols if not symbol.isalnum()]
+        if invalid:
+            subscriber.push_message({"type": "error", "detail": f"Invalid symbols: {', '.join(invalid)}"})
+            return
+        if action == "subscribe":
+            try:
+                quote_hub.subscribe(subscriber, symbols)
+            except QuoteStreamError as e:
+                subscriber.push_message({"type": "error", "detail": str(e)})
+                return
+            subscriber.push_message({"type": "subscribed", "symbols": sorted(subscriber.symbols)})
+        elif action == "unsubscribe":
+            quote_hub.unsubscribe(subscriber, symbols)
+            subscriber.push_message({"type": "unsubscribed", "symbols": sorted(subscriber.symbols)})
+        else:
+            subscriber.push_message({"type": "error", "detail": "action must be subscribe or unsubscribe."})
+
+    sender = asyncio.create_task(_send())
+    try:
+        initial_symbols = websocket.query_params.get("symbols")
+        if initial_symbols:
+            _handle("subscribe", [symbol for symbol in initial_symbols.split(",") if symbol.strip()])
+        while True:
+            raw_message = await websocket.receive_text()
+            try:
+                message = json.loads(raw_message)
+            except json.JSONDecodeError:
+                subscriber.push_message({"type": "error", "detail": "Messages must be JSON."})
+                continue
+            if not isinstance(message, dict):
+                subscriber.push_message({"type": "error", "detail": "Messages must be JSON objects."})
+                continue
+            _handle(message.get("action"), message.get("symbols"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        quote_hub.disconnect(subscriber)
+        sender.cancel()
+
+
+@app.get("/trending")
+async def get_trending(limit: int = Query(20, ge=1, le=100, description="Number of symbols to return")):
+    """
+    Returns the most mentioned symbols across DEFAULT_SUBREDDITS, ranked by mention counts
+    that decay with a half-life of TRENDING_HALF_LIFE_SECONDS. Counts come from a periodic
+    sweep of each subreddit's newest posts, not from per-symbol searches.
+    """
+    return {
+        "subreddits": trending_scanner.subreddits,
+        "interval_seconds": trending_scanner.interval_seconds,
+        "half_life_seconds": trending_scanner.half_life_seconds,
+        "updated_at": trending_scanner.last_scan_at,
+        "trending": trending_scanner.trending(limit),
+    }
+
+
+@app.get("/history")
+async def get_history(
+    symbol: str = Query(..., min_length=1, description="Stock ticker symbol (e.g. TSLA, GME)"),
+    window: str = Query("24h", description="Lookback window, e.g. 90m, 6h or 3d"),
+):
+    """
+    Returns the recorded sentiment, post count, price and changesPercentage samples for a
+    symbol over the window, with per-field summaries, a rolling mean of sentiment and the
+    z-score of the latest mention volume. Samples are recorded whenever data is refreshed.
+    """
+    symbol = _validate_symbol(symbol)
+    window_seconds = _parse_window(window)
+    history = await history_store.query(symbol, window_seconds)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No history recorded for {symbol} yet.")
+    return history
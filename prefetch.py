@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class HotSymbolTracker:
+    """
+    Tracks request frequency per symbol as an exponentially decayed counter with the given
+    half-life, keeping at most `max_symbols` symbols (the coldest are dropped first). Also
+    remembers the last company name seen per symbol, which sentiment refreshes need.
+    """
+
+    def __init__(self, half_life_seconds: float = 600, max_symbols: int = 2000):
+        self.decay_rate = math.log(2) / half_life_seconds
+        self.max_symbols = max_symbols
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        self._names: Dict[str, str] = {}
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.exp(-self.decay_rate * (now - updated))
+
+    def record(self, symbol: str, name: str = ""):
+        now = time.time()
+        score, updated = self._scores.get(symbol, (0.0, now))
+        self._scores[symbol] = (self._decayed(score, updated, now) + 1.0, now)
+        if name:
+            self._names[symbol] = name
+        if len(self._scores) > self.max_symbols * 1.1:
+            self._trim(now)
+
+    def _trim(self, now: float):
+        keep = heapq.nlargest(self.max_symbols, self._scores.items(), key=lambda item: self._decayed(item[1][0], item[1][1], now))
+        self._scores = dict(keep)
+        self._names = {symbol: name for symbol, name in self._names.items() if symbol in self._scores}
+
+    def top(self, k: int) -> List[Tuple[str, float]]:
+        now = time.time()
+        ranked = heapq.nlargest(k, self._scores.items(), key=lambda item: self._decayed(item[1][0], item[1][1], now))
+        return [(symbol, round(self._decayed(score, updated, now), 3)) for symbol, (score, updated) in ranked]
+
+    def name(self, symbol: str) -> str:
+        return self._names.get(symbol, "")
+
+
+class PrefetchTarget:
+    """
+    A cache kept warm by the scheduler. `refresh` fetches a list of symbols in one call,
+    `cost` estimates the upstream requests that takes, and `budget` names the upstream
+    budget those requests count against.
+    """
+
+    def __init__(self, cache: TTLCache, refresh: Callable[[List[str]], Awaitable[Any]], budget: str, cost: Callable[[int], int]):
+        self.cache = cache
+        self.refresh = refresh
+        self.budget = budget
+        self.cost = cost
+        self.refreshed = 0
+        self.skipped_for_budget = 0
+
+
+class PrefetchScheduler:
+    """
+    Background loop that refreshes cache entries for the hottest symbols shortly before they
+    expire, so popular tickers are nearly always served from cache. Each tick it may spend
+    at most `budgets[name]` upstream requests per budget; due symbols that do not fit wait
+    for the next tick, hottest first.
+    """
+
+    def __init__(
+        self,
+        tracker: HotSymbolTracker,
+        targets: List[PrefetchTarget],
+        budgets: Dict[str, int],
+        interval_seconds: float = 30,
+        lead_seconds: float = 60,
+        top_k: int = 50,
+    ):
+        self.tracker = tracker
+        self.targets = targets
+        self.budgets = budgets
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.top_k = top_k
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+
+    def _is_due(self, cache: TTLCache, symbol: str, now: float) -> bool:
+        entry = cache.get_entry(symbol)
+        if entry is None:
+            return True
+        # Short-lived entries (partial or negative results) are only retried once they expire.
+        lead_seconds = self.lead_seconds if entry.ttl >= cache.ttl else 0
+        return entry.timestamp + entry.ttl - now < lead_seconds
+
+    def _affordable(self, target: PrefetchTarget, due: List[str], remaining: int) -> int:
+        count = len(due)
+        while count > 0 and target.cost(count) > remaining:
+            count -= 1
+        return count
+
+    async def tick(self):
+        self.ticks += 1
+        now = time.time()
+        hot_symbols = [symbol for symbol, _ in self.tracker.top(self.top_k)]
+        remaining = dict(self.budgets)
+        refreshes = []
+        for target in self.targets:
+            due = [symbol for symbol in hot_symbols if self._is_due(target.cache, symbol, now)]
+            if due and target.cache.backend is not None:
+                # Another worker may already have refreshed these entries in the shared store.
+                for symbol in due:
+                    await target.cache.load_from_backend(symbol)
+                due = [symbol for symbol in due if self._is_due(target.cache, symbol, now)]
+            if not due:
+                continue
+            count = self._affordable(target, due, remaining.get(target.budget, 0))
+            target.skipped_for_budget += len(due) - count
+            if count == 0:
+                continue
+            remaining[target.budget] -= target.cost(count)
+            target.refreshed += count
+            refreshes.append(target.refresh(due[:count]))
+            logger.info(f"Prefetching {count} hot symbols into the {target.cache.name} cache.")
+
+        results = await asyncio.gather(*refreshes, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Prefetch refresh failed: {result}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Unexpected error in prefetch scheduler tick:")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Prefetch scheduler started (every {self.interval_seconds}s, top {self.top_k} symbols).")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ticks": self.ticks,
+            "budgets_per_tick": dict(self.budgets),
+            "hot_symbols": self.tracker.top(10),
+            "targets": {
+                target.cache.name: {"refreshed": target.refreshed, "skipped_for_budget": target.skipped_for_budget}
+                for target in self.targets
+            },
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from encoded_body import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteStreamError(Exception):
+    pass
+
+
+class QuoteSubscriber:
+    """
+    One connected client. Quote updates are conflated per symbol: while a slow client is
+    still sending, newer quotes replace older unsent ones, so its backlog never exceeds one
+    quote per subscribed symbol. Control messages (acks, errors) are queued in order.
+    """
+
+    def __init__(self, max_symbols: int):
+        self.max_symbols = max_symbols
+        self.symbols: Set[str] = set()
+        self._pending_quotes: Dict[str, Dict[str, Any]] = {}
+        self._pending_messages: List[Dict[str, Any]] = []
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.conflated = 0
+
+    def push_quote(self, symbol: str, quote: Dict[str, Any]):
+        if symbol in self._pending_quotes:
+            self.conflated += 1
+        self._pending_quotes[symbol] = quote
+        self._ready.set()
+
+    def push_message(self, message: Dict[str, Any]):
+        self._pending_messages.append(message)
+        self._ready.set()
+
+    async def run_sender(self, send: Callable[[str], Awaitable[None]], send_timeout: float):
+        """Sends pending messages until cancelled. Raises asyncio.TimeoutError if one send takes longer than send_timeout."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            messages, self._pending_messages = self._pending_messages, []
+            quotes, self._pending_quotes = self._pending_quotes, {}
+            if quotes:
+                messages.append({"type": "quotes", "quotes": quotes})
+            for message in messages:
+                await asyncio.wait_for(send(dumps(message).decode("utf-8")), send_timeout)
+                self.sent += 1
+
+
+class QuoteHub:
+    """
+    Shares live quotes across WebSocket clients. Keeps the union of all subscribed symbols,
+    refreshes them every `interval_seconds` with one batched `fetch_quotes` call and pushes
+    each quote only to its subscribers and only when it changed. Newly subscribed symbols
+    that have no quote yet are fetched right away (at most once per `min_fetch_gap_seconds`).
+    Upstream cost therefore depends on the number of distinct symbols, not on clients.
+    """
+
+    def __init__(
+        self,
+        fetch_quotes: Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]],
+        interval_seconds: float = 5,
+        max_symbols: int = 500,
+        max_symbols_per_client: int = 50,
+        min_fetch_gap_seconds: float = 1,
+    ):
+        self.fetch_quotes = fetch_quotes
+        self.interval_seconds = interval_seconds
+        self.max_symbols = max_symbols
+        self.max_symbols_per_client = max_symbols_per_client
+        self.min_fetch_gap_seconds = min_fetch_gap_seconds
+        self._subscribers_by_symbol: Dict[str, Set[QuoteSubscriber]] = {}
+        self._subscribers: Set[QuoteSubscriber] = set()
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.upstream_symbols_fetched = 0
+        self.updates_pushed = 0
+
+    def connect(self) -> QuoteSubscriber:
+        subscriber = QuoteSubscriber(self.max_symbols_per_client)
+        self._subscribers.add(subscriber)
+        self._start()
+        return subscriber
+
+    def disconnect(self, subscriber: QuoteSubscriber):
+        self.unsubscribe(subscriber, list(subscriber.symbols))
+        self._subscribers.discard(subscriber)
+
+    def subscribe(self, subscriber: QuoteSubscriber, symbols: List[str]) -> List[str]:
+        """
+        Adds symbols for subscriber and queues the latest known quotes. Returns the symbols added.
+        All or nothing: if the per-connection or server symbol limit would be exceeded, raises
+        QuoteStreamError without subscribing any of them.
+        """
+        new_symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol not in subscriber.symbols))
+        if len(subscriber.symbols) + len(new_symbols) > subscriber.max_symbols:
+            raise QuoteStreamError(f"At most {subscriber.max_symbols} symbols per connection.")
+        unstreamed = sum(1 for symbol in new_symbols if symbol not in self._subscribers_by_symbol)
+        if len(self._subscribers_by_symbol) + unstreamed > self.max_symbols:
+            raise QuoteStreamError("The server is streaming the maximum number of symbols; try again later.")
+
+        added = []
+        for symbol in new_symbols:
+            self._subscribers_by_symbol.setdefault(symbol, set()).add(subscriber)
+            subscriber.symbols.add(symbol)
+            added.append(symbol)
+            if symbol in self._latest:
+                subscriber.push_quote(symbol, self._latest[symbol])
+        if any(symbol not in self._latest for symbol in added) and self._wakeup is not None:
+            self._wakeup.set()
+        return added
+
+    def unsubscribe(self, subscriber: QuoteSubscriber, symbols: List[str]):
+        for symbol in symbols:
+            subscriber.symbols.discard(symbol)
+            subscribers = self._subscribers_by_symbol.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers_by_symbol[symbol]
+                self._latest.pop(symbol, None)
+
+    async def tick(self, symbols: Optional[List[str]] = None):
+        """Fetches quotes for symbols (default: every subscribed symbol) and pushes the changed ones."""
+        symbols = symbols if symbols is not None else list(self._subscribers_by_symbol)
+        if not symbols:
+            return
+        self.ticks += 1
+        self.upstream_symbols_fetched += len(symbols)
+        quotes = await self.fetch_quotes(symbols)
+        for symbol, quote in quotes.items():
+            subscribers = self._subscribers_by_symbol.get(symbol)
+            if not subscribers or self._latest.get(symbol) == quote:
+                continue
+            self._latest[symbol] = quote
+            for subscriber in subscribers:
+                subscriber.push_quote(symbol, quote)
+                self.updates_pushed += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_full_tick = loop.time()
+        while True:
+            timeout = max(next_full_tick - loop.time(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if loop.time() >= next_full_tick:
+                    next_full_tick = loop.time() + self.interval_seconds
+                    await self.tick()
+                else:
+                    await self.tick([symbol for symbol in self._subscribers_by_symbol if symbol not in self._latest])
+            except Exception:
+                logger.exception("Unexpected error refreshing streamed quotes:")
+            await asyncio.sleep(self.min_fetch_gap_seconds)
+
+    def _start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Quote stream started (every {self.interval_seconds}s).")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._subscribers),
+            "symbols": len(self._subscribers_by_symbol),
+            "ticks": self.ticks,
+            "upstream_symbols_fetched": self.upstream_symbols_fetched,
+            "updates_pushed": self.updates_pushed,
+            "updates_conflated": sum(subscriber.conflated for subscriber in self._subscribers),
+        }
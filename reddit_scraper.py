@@ -1,19 +1,253 @@
 import aiohttp
 import asyncio
+import functools
 import re
 import logging
-from typing import List, Dict, Optional 
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, List, Dict, Mapping, Optional, Tuple
+from urllib.parse import quote_plus
+
+from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS, observe_upstream
+from reddit_store import RedditPostStore, SymbolPosts
 
 logger = logging.getLogger(__name__)
 
 class RedditScrapingError(Exception):
     pass
 
-async def scrape_reddit_data(
-    symbol: str,
-    company_name: str = "",
-    subreddits: Optional[List[str]] = None 
-) -> List[Dict]:
+class RedditRateLimitError(RedditScrapingError):
+    pass
+
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com")
+REDDIT_HEADERS = {'User-Agent': 'StockHypeRecommender/1.0 (by /u/Few_Cockroach_7028)'}
+REDDIT_CONNECTION_LIMIT = 50
+REDDIT_CONNECTIONS_PER_HOST = 10
+REDDIT_DNS_CACHE_TTL_SECONDS = 300
+REDDIT_KEEPALIVE_TIMEOUT_SECONDS = 60
+# Upper bound on in-flight requests to reddit.com, so batch refreshes queue instead of opening hundreds of sockets.
+REDDIT_MAX_CONCURRENT_REQUESTS = 8
+# Once fewer requests than this are left in Reddit's rate-limit window, the rest are spread evenly until it resets.
+REDDIT_PACE_BELOW_REMAINING = 20
+REDDIT_MAX_RETRIES = 3
+# A request fails fast instead of queueing when the budget is exhausted for longer than this.
+REDDIT_MAX_RATE_LIMIT_WAIT_SECONDS = 30
+
+# Incremental ingestion: first scrape of a search walks back REDDIT_INITIAL_PAGES pages,
+# later scrapes only page forward from the newest post seen.
+REDDIT_PAGE_SIZE = 100
+REDDIT_ALL_PAGE_SIZE = 25
+REDDIT_INITIAL_PAGES = 2
+REDDIT_INCREMENTAL_PAGES = 3
+REDDIT_CURSOR_RESET_SECONDS = 3600
+
+_URL_MENTION_PATTERN = re.compile(r'http\S+|www\S+|@\S+|#\S+')
+_MARKDOWN_PATTERN = re.compile(r'(\*\*|__|~~|\*|_|`)')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Replace with a backend-backed store (see main.py) to persist posts and cursors.
+post_store = RedditPostStore()
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=REDDIT_CONNECTION_LIMIT,
+        limit_per_host=REDDIT_CONNECTIONS_PER_HOST,
+        ttl_dns_cache=REDDIT_DNS_CACHE_TTL_SECONDS,
+        keepalive_timeout=REDDIT_KEEPALIVE_TIMEOUT_SECONDS,
+    )
+    return aiohttp.ClientSession(connector=connector, headers=REDDIT_HEADERS)
+
+async def open_session() -> aiohttp.ClientSession:
+    """Opens the shared, pooled Reddit session. Called from the app startup hook."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info("Shared aiohttp ClientSession opened for Reddit scraping.")
+    return _session
+
+async def close_session():
+    """Closes the shared Reddit session. Called from the app shutdown hook."""
+    global _session
+    if _session and not _session.closed:
+        await _session.close()
+        logger.info("Shared aiohttp ClientSession closed for Reddit scraping.")
+    _session = None
+
+async def warm_up(timeout: float = 5) -> bool:
+    """Pre-opens a pooled connection to Reddit with a HEAD request. Returns True if the host answered."""
+    session = await open_session()
+    try:
+        async with session.head(REDDIT_BASE_URL, timeout=aiohttp.ClientTimeout(total=timeout)):
+            return True
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Could not pre-open a connection to Reddit: {e}")
+        return False
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[aiohttp.ClientSession]:
+    """Yields the app-managed pooled session when it is open, otherwise a one-off session closed on exit."""
+    shared_session = _session if _session is not None and not _session.closed else None
+    session = shared_session or _create_session()
+    try:
+        yield session
+    finally:
+        if shared_session is None:
+            await session.close()
+
+class RedditRateGovernor:
+    """
+    Shared admission control for every Reddit request, driven by Reddit's rate-limit headers
+    (x-ratelimit-remaining, x-ratelimit-reset). At most `max_concurrent` requests are in
+    flight. While the window has plenty of budget left, requests go out right away; below
+    `pace_below_remaining` they are spaced evenly over the time left until the reset, and with
+    no budget left they wait for the reset. Waiters are admitted in arrival order. Since the
+    headers count every client behind our IP, other workers' traffic is accounted for too.
+    """
+
+    def __init__(self, max_concurrent: int, pace_below_remaining: int, max_wait_seconds: float):
+        self.max_concurrent = max_concurrent
+        self.pace_below_remaining = pace_below_remaining
+        self.max_wait_seconds = max_wait_seconds
+        self._in_flight = 0
+        # Requests left in the current window (None until a response reports it) and when it resets (monotonic).
+        self._remaining: Optional[float] = None
+        self._reset_at = 0.0
+        self._next_paced_at = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+        self.rate_limited = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+
+    def _delay(self, now: float) -> Optional[float]:
+        """Seconds until the next request may be sent, or None while the concurrency limit is reached."""
+        if self._in_flight >= self.max_concurrent:
+            return None
+        if self._remaining is None:
+            return 0.0
+        if now >= self._reset_at:
+            self._remaining = None  # New window; the next response reports its budget.
+            return 0.0
+        if self._remaining < 1:
+            return self._reset_at - now
+        if self._remaining <= self.pace_below_remaining:
+            return max(self._next_paced_at - now, 0.0)
+        return 0.0
+
+    def _grant(self, now: float):
+        self._in_flight += 1
+        self.granted += 1
+        if self._remaining is not None:
+            if self._remaining <= self.pace_below_remaining:
+                self._next_paced_at = now + (self._reset_at - now) / self._remaining
+            self._remaining -= 1
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            now = time.monotonic()
+            delay = self._delay(now)
+            if delay is None:
+                return  # release() dispatches again.
+            if delay > 0:
+                self._timer = future.get_loop().call_later(delay, self._dispatch)
+                return
+            self._waiters.popleft()
+            self._grant(now)
+            future.set_result(None)
+
+    async def acquire(self):
+        """Waits until a request may be sent. Pair every successful acquire with release()."""
+        now = time.monotonic()
+        if not self._waiters and self._delay(now) == 0:
+            self._grant(now)
+            return
+        if self._remaining is not None and self._remaining < 1 and self._reset_at - now > self.max_wait_seconds:
+            self.rejected += 1
+            raise RedditRateLimitError(f"Reddit rate limit exhausted; resets in {self._reset_at - now:.0f}s.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.throttled += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # Granted just before the caller was cancelled.
+            raise
+        finally:
+            self.throttle_seconds += time.monotonic() - now
+
+    def release(self, headers: Optional[Mapping[str, str]] = None):
+        """Frees a slot and updates the budget from the response's rate-limit headers, if any."""
+        self._in_flight -= 1
+        if headers is not None:
+            self._update(headers)
+        self._dispatch()
+
+    def _update(self, headers: Mapping[str, str]):
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset_in = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        now = time.monotonic()
+        # Responses arrive out of order; within a window keep the lowest budget seen.
+        if self._remaining is None or now >= self._reset_at:
+            self._remaining = remaining
+        else:
+            self._remaining = min(self._remaining, remaining)
+        self._reset_at = now + reset_in
+
+    def rate_limited_for(self, seconds: float):
+        """Records a 429: no request is admitted for `seconds`."""
+        self.rate_limited += 1
+        self._remaining = 0.0
+        self._reset_at = max(self._reset_at, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        window_open = self._remaining is not None and now < self._reset_at
+        return {
+            "in_flight": self._in_flight,
+            "queued": sum(1 for future in self._waiters if not future.done()),
+            "max_queue_depth": self.max_queue_depth,
+            "remaining": self._remaining if window_open else None,
+            "resets_in_seconds": round(self._reset_at - now, 1) if window_open else None,
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "rate_limited": self.rate_limited,
+            "rejected": self.rejected,
+        }
+
+governor = RedditRateGovernor(REDDIT_MAX_CONCURRENT_REQUESTS, REDDIT_PACE_BELOW_REMAINING, REDDIT_MAX_RATE_LIMIT_WAIT_SECONDS)
+
+def _rate_limit_wait(headers: Mapping[str, str], attempt: int) -> float:
+    for header in ("x-ratelimit-reset", "retry-after"):
+        try:
+            return max(float(headers[header]), 0.0)
+        except (KeyError, ValueError):
+            continue
+    return float(2 ** attempt)
+
+def _build_query_terms(symbol: str, company_name: str) -> List[str]:
     search_terms = [symbol]
     if company_name:
         search_terms.append(company_name)
@@ -24,43 +258,144 @@ async def scrape_reddit_data(
         if ", Inc." in company_name:
             search_terms.append(company_name.replace(", Inc.", ""))
 
-    query_terms = list(set([term.lower() for term in search_terms]))
+    return list(set([term.lower() for term in search_terms]))
 
+def _build_sources(symbol: str, company_name: str, subreddits: Optional[List[str]]) -> List[Tuple[str, str, int]]:
+    """Returns the (subreddit, query, page size) searches to run for a symbol."""
     target_subreddits = subreddits if subreddits is not None else ["wallstreetbets", "stocks", "investing", "stockmarket"]
+    sources = [(s, symbol, REDDIT_PAGE_SIZE) for s in target_subreddits]
+    if company_name and "all" not in target_subreddits: # Avoid adding r/all twice if already in custom list
+        sources.append(("all", company_name, REDDIT_ALL_PAGE_SIZE))
+    return sources
 
-    all_scraped_data = []
-    unique_texts = set()
+def clean_post_text(text: str) -> str:
+    cleaned_text = _URL_MENTION_PATTERN.sub('', text) # Remove URLs, mentions, hashtags
+    cleaned_text = _MARKDOWN_PATTERN.sub('', cleaned_text) # Remove bold, italics, strikethrough, inline code
+    return _WHITESPACE_PATTERN.sub(' ', cleaned_text).strip() # Remove extra whitespace
 
-    base_urls = [f"https://www.reddit.com/r/{s}/search.json?q={symbol}&restrict_sr=on&sort=new&limit=25" for s in target_subreddits]
+async def fetch_new_posts(
+    session: aiohttp.ClientSession,
+    subreddit: str,
+    query: str,
+    cursor: Optional[str],
+    page_size: int = REDDIT_PAGE_SIZE,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetches posts for a (subreddit, query) search that are newer than `cursor`, paging
+    towards newer items with Reddit's `before` parameter. Without a cursor it walks back
+    up to REDDIT_INITIAL_PAGES pages with `after`. Returns the posts (newest first) and
+    the fullname of the newest post, which becomes the next cursor.
+    """
+    base_url = f"{REDDIT_BASE_URL}/r/{subreddit}/search.json?q={quote_plus(query)}&restrict_sr=on&sort=new&limit={page_size}"
+    posts: List[Dict] = []
 
-    if company_name and "all" not in target_subreddits: # Avoid adding r/all twice if already in custom list
-        base_urls.append(f"https://www.reddit.com/r/all/search.json?q={company_name}&restrict_sr=on&sort=new&limit=10")
+    if cursor:
+        before = cursor
+        for _ in range(REDDIT_INCREMENTAL_PAGES):
+            page = await fetch_reddit_posts(session, f"{base_url}&before={before}")
+            if not page:
+                break
+            posts = page + posts
+            before = page[0].get('data', {}).get('name')
+            if len(page) < page_size or not before:
+                break
+    else:
+        after = None
+        for _ in range(REDDIT_INITIAL_PAGES):
+            page = await fetch_reddit_posts(session, f"{base_url}&after={after}" if after else base_url)
+            posts.extend(page)
+            after = page[-1].get('data', {}).get('name') if page else None
+            if len(page) < page_size or not after:
+                break
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for url in base_urls:
-            tasks.append(fetch_reddit_posts(session, url))
+    newest = posts[0].get('data', {}).get('name') if posts else None
+    return posts, newest or cursor
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+async def ingest_source(
+    session: aiohttp.ClientSession,
+    record: SymbolPosts,
+    subreddit: str,
+    query: str,
+    page_size: int,
+    query_terms: List[str],
+) -> int:
+    """Fetches new posts for one search, cleans only those, and adds relevant ones to record. Returns the number added."""
+    source_key = f"{subreddit}|{query.lower()}"
+    now = time.time()
+    cursor_entry = record.cursors.get(source_key)
+    cursor = None
+    # A cursor that has not advanced for a while may point at a deleted post, which makes
+    # `before` return nothing forever; fall back to a fresh first page (dedupe absorbs overlap).
+    if cursor_entry and now - cursor_entry[1] < REDDIT_CURSOR_RESET_SECONDS:
+        cursor = cursor_entry[0]
 
-        for res in results:
-            if isinstance(res, Exception):
-                logger.error(f"Error fetching Reddit data: {res}")
-                continue
+    posts, newest = await fetch_new_posts(session, subreddit, query, cursor, page_size)
+    if cursor is None and cursor_entry is not None:
+        # Always restamp after a reset fetch, even if nothing newer turned up; otherwise a quiet
+        # search would re-walk the initial pages on every refresh.
+        record.cursors[source_key] = (newest or cursor_entry[0], now)
+    elif newest and (cursor_entry is None or newest != cursor_entry[0]):
+        record.cursors[source_key] = (newest, now)
+
+    added = 0
+    for post in posts:
+        data = post.get('data', {})
+        cleaned_text = clean_post_text(data.get('title', '') + " " + data.get('selftext', ''))
+        if not cleaned_text or not any(q_term in cleaned_text.lower() for q_term in query_terms):
+            continue
+        url = REDDIT_BASE_URL + data.get('permalink', '')
+        if post_store.add_post(record, cleaned_text, url, float(data.get('created_utc') or now)):
+            added += 1
+    return added
+
+async def prepare_ingest(
+    symbol: str,
+    company_name: str,
+    session: aiohttp.ClientSession,
+    subreddits: Optional[List[str]] = None,
+) -> Tuple[SymbolPosts, Dict[str, Callable[[], Awaitable[int]]]]:
+    """
+    Loads the stored record for a symbol and returns it with one ingest callable per search,
+    keyed "reddit/<subreddit>", so callers can run the searches under their own scheduling.
+    Pass the record to finish_ingest once they are done.
+    """
+    query_terms = _build_query_terms(symbol, company_name)
+    record = await post_store.get(symbol)
+    fetchers = {
+        f"reddit/{subreddit}": functools.partial(ingest_source, session, record, subreddit, query, page_size, query_terms)
+        for subreddit, query, page_size in _build_sources(symbol, company_name, subreddits)
+    }
+    return record, fetchers
+
+async def finish_ingest(symbol: str, record: SymbolPosts) -> List[Dict]:
+    """Expires old posts, persists the record and returns every stored post for the symbol (newest first)."""
+    post_store.expire(record)
+    await post_store.save(symbol)
+    return post_store.posts_newest_first(record)
 
-            for post in res:
-                text = post.get('data', {}).get('title', '') + " " + post.get('data', {}).get('selftext', '')
-                url = "https://www.reddit.com" + post.get('data', {}).get('permalink', '')
+async def scrape_reddit_data(
+    symbol: str,
+    company_name: str = "",
+    subreddits: Optional[List[str]] = None 
+) -> List[Dict]:
+    """
+    Incrementally ingests new Reddit posts for a symbol and returns every stored, unexpired
+    post for it (newest first). Only posts newer than each search's cursor are downloaded
+    and cleaned; previously seen posts come from the post store.
+    """
+    async with session_scope() as session:
+        record, fetchers = await prepare_ingest(symbol, company_name, session, subreddits)
+        results = await asyncio.gather(*(fetch() for fetch in fetchers.values()), return_exceptions=True)
 
-                # ✅ ENHANCEMENT: Basic Markdown Cleanup
-                cleaned_text = re.sub(r'http\S+|www\S+|@\S+|#\S+', '', text) # Remove URLs, mentions, hashtags
-                cleaned_text = re.sub(r'(\*\*|__|~~|\*|_|`)', '', cleaned_text) # Remove bold, italics, strikethrough, inline code
-                cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip() # Remove extra whitespace
+    new_posts = 0
+    for res in results:
+        if isinstance(res, Exception):
+            logger.error(f"Error fetching Reddit data: {res}")
+            continue
+        new_posts += res
 
-                if cleaned_text and cleaned_text not in unique_texts:
-                    if any(q_term in cleaned_text.lower() for q_term in query_terms):
-                        all_scraped_data.append({"text": cleaned_text, "source_url": url})
-                        unique_texts.add(cleaned_text)
+    all_scraped_data = await finish_ingest(symbol, record)
+    logger.info(f"Ingested {new_posts} new Reddit posts for {symbol}; {len(all_scraped_data)} posts in window.")
 
     if not all_scraped_data:
         logger.warning(f"No relevant Reddit data found for symbol: {symbol}, name: {company_name}")
@@ -68,16 +403,48 @@ async def scrape_reddit_data(
     return all_scraped_data
 
 
-async def fetch_reddit_posts(session: aiohttp.ClientSession, url: str) -> List[Dict]:
-    headers = {'User-Agent': 'StockHypeRecommender/1.0 (by /u/Few_Cockroach_7028)'}
-    try:
-        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            data = await response.json()
-            return data.get('data', {}).get('children', [])
-    except aiohttp.ClientError as e:
-        raise RedditScrapingError(f"Network or client error fetching {url}: {e}")
-    except asyncio.TimeoutError:
-        raise asyncio.TimeoutError(f"Request to {url} timed out.")
-    except Exception as e:
-        raise RedditScrapingError(f"An unexpected error occurred during Reddit fetch from {url}: {e}")
\ No newline at end of file
+async def fetch_subreddit_new(session: aiohttp.ClientSession, subreddit: str, limit: int = REDDIT_PAGE_SIZE) -> List[Dict]:
+    """Fetches the newest posts of a subreddit (newest first)."""
+    return await fetch_reddit_posts(session, f"{REDDIT_BASE_URL}/r/{subreddit}/new.json?limit={limit}", endpoint="new")
+
+async def fetch_reddit_posts(session: aiohttp.ClientSession, url: str, endpoint: str = "search") -> List[Dict]:
+    """
+    Fetches one listing through the shared rate governor. A 429 is retried (up to
+    REDDIT_MAX_RETRIES attempts) once the window Reddit reports has reset.
+    """
+    for attempt in range(REDDIT_MAX_RETRIES):
+        if attempt > 0:
+            UPSTREAM_RETRIES.inc(upstream="reddit", endpoint=endpoint)
+        await governor.acquire()
+        request_started = time.perf_counter()
+        response_headers = None
+        try:
+            async with session.get(url, headers=REDDIT_HEADERS, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                response_headers = response.headers
+                observe_upstream("reddit", endpoint, time.perf_counter() - request_started, response.status)
+                if response.status == 429:
+                    wait = _rate_limit_wait(response.headers, attempt)
+                    governor.rate_limited_for(wait)
+                    if attempt == REDDIT_MAX_RETRIES - 1 or wait > REDDIT_MAX_RATE_LIMIT_WAIT_SECONDS:
+                        raise RedditRateLimitError(f"Reddit rate limit exceeded fetching {url}; resets in {wait:.0f}s.")
+                    logger.warning(f"Reddit rate limited. Retrying {url} after {wait:.1f} seconds...")
+                    continue
+                response.raise_for_status()
+                data = await response.json()
+                return data.get('data', {}).get('children', [])
+        except RedditScrapingError:
+            raise
+        except aiohttp.ClientError as e:
+            if not isinstance(e, aiohttp.ClientResponseError):
+                observe_upstream("reddit", endpoint, time.perf_counter() - request_started)
+                UPSTREAM_ERRORS.inc(upstream="reddit", endpoint=endpoint)
+            raise RedditScrapingError(f"Network or client error fetching {url}: {e}")
+        except asyncio.TimeoutError:
+            observe_upstream("reddit", endpoint, time.perf_counter() - request_started)
+            UPSTREAM_TIMEOUTS.inc(upstream="reddit", endpoint=endpoint)
+            raise asyncio.TimeoutError(f"Request to {url} timed out.")
+        except Exception as e:
+            raise RedditScrapingError(f"An unexpected error occurred during Reddit fetch from {url}: {e}")
+        finally:
+            governor.release(response_headers)
+    raise RedditScrapingError(f"Failed to fetch {url} after {REDDIT_MAX_RETRIES} attempts.")
\ No newline at end of file
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_store import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class SymbolPosts:
+    """Posts seen for one symbol plus the newest fullname seen per (subreddit, query) cursor."""
+
+    __slots__ = ("posts", "cursors")
+
+    def __init__(self):
+        # content hash -> (created_utc, cleaned text, permalink)
+        self.posts: Dict[bytes, Tuple[float, str, str]] = {}
+        # "subreddit|query" -> (newest fullname, time the cursor last advanced)
+        self.cursors: Dict[str, Tuple[str, float]] = {}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "posts": [[key.hex(), created, text, url] for key, (created, text, url) in self.posts.items()],
+            "cursors": {source: [name, advanced] for source, (name, advanced) in self.cursors.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "SymbolPosts":
+        record = cls()
+        for key, created, text, url in data.get("posts", []):
+            record.posts[bytes.fromhex(key)] = (created, text, url)
+        for source, (name, advanced) in data.get("cursors", {}).items():
+            record.cursors[source] = (name, advanced)
+        return record
+
+    def merge(self, other: "SymbolPosts"):
+        """Adds other's posts and keeps, per search, whichever cursor advanced most recently."""
+        for key, post in other.posts.items():
+            self.posts.setdefault(key, post)
+        for source, (name, advanced) in other.cursors.items():
+            current = self.cursors.get(source)
+            if current is None or advanced > current[1]:
+                self.cursors[source] = (name, advanced)
+
+
+class RedditPostStore:
+    """
+    Per-symbol store of already ingested Reddit posts, used for incremental scraping.
+    Posts are deduplicated by a 64-bit content hash of their cleaned text and expire once
+    older than `max_age_seconds`. Each symbol keeps at most `max_posts_per_symbol` newest
+    posts and the least recently used symbols are dropped beyond `max_symbols`. With a
+    CacheBackend the records, cursors included, survive restarts and are shared by workers:
+    save() merges the stored row into the in-memory record before writing it back, so one
+    worker's save never drops posts or cursors another worker saved.
+    """
+
+    NAMESPACE = "reddit_posts"
+
+    def __init__(self, max_age_seconds: float = 86400, max_posts_per_symbol: int = 1000, max_symbols: int = 2000, backend: Optional[CacheBackend] = None):
+        self.max_age_seconds = max_age_seconds
+        self.max_posts_per_symbol = max_posts_per_symbol
+        self.max_symbols = max_symbols
+        self.backend = backend
+        self._records: "OrderedDict[str, SymbolPosts]" = OrderedDict()
+        self.posts_added = 0
+        self.duplicates_skipped = 0
+        self.posts_expired = 0
+
+    async def get(self, symbol: str) -> SymbolPosts:
+        record = self._records.get(symbol)
+        if record is None and self.backend is not None:
+            stored = await asyncio.to_thread(self.backend.get, self.NAMESPACE, symbol)
+            if stored is not None:
+                record = SymbolPosts.from_json(stored[0])
+        if record is None:
+            record = SymbolPosts()
+        self._records[symbol] = record
+        self._records.move_to_end(symbol)
+        while len(self._records) > self.max_symbols:
+            self._records.popitem(last=False)
+        return record
+
+    async def save(self, symbol: str):
+        record = self._records.get(symbol)
+        if self.backend is None or record is None:
+            return
+        stored = await asyncio.to_thread(self.backend.get, self.NAMESPACE, symbol)
+        if stored is not None:
+            record.merge(SymbolPosts.from_json(stored[0]))
+            self.expire(record)
+        await asyncio.to_thread(self.backend.set, self.NAMESPACE, symbol, record.to_json(), time.time(), self.max_age_seconds)
+
+    def add_post(self, record: SymbolPosts, text: str, url: str, created_utc: float) -> bool:
+        """Adds a cleaned post. Returns False if identical text was already stored."""
+        key = content_hash(text)
+        if key in record.posts:
+            self.duplicates_skipped += 1
+            return False
+        record.posts[key] = (created_utc, text, url)
+        self.posts_added += 1
+        return True
+
+    def expire(self, record: SymbolPosts, now: Optional[float] = None):
+        cutoff = (now if now is not None else time.time()) - self.max_age_seconds
+        expired = [key for key, (created, _, _) in record.posts.items() if created < cutoff]
+        for key in expired:
+            del record.posts[key]
+        self.posts_expired += len(expired)
+        if len(record.posts) > self.max_posts_per_symbol:
+            newest = sorted(record.posts.items(), key=lambda item: item[1][0], reverse=True)[:self.max_posts_per_symbol]
+            self.posts_expired += len(record.posts) - len(newest)
+            record.posts = dict(newest)
+
+    @staticmethod
+    def posts_newest_first(record: SymbolPosts) -> List[Dict[str, str]]:
+        return [
+            {"text": text, "source_url": url}
+            for created, text, url in sorted(record.posts.values(), key=lambda post: post[0], reverse=True)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._records),
+            "posts": sum(len(record.posts) for record in self._records.values()),
+            "posts_added": self.posts_added,
+            "duplicates_skipped": self.duplicates_skipped,
+            "posts_expired": self.posts_expired,
+        }
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import multiprocessing
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+# Long posts add little signal but cost linear time to score.
+MAX_TEXT_LENGTH = 2000
+
+_analyzer: Optional["SentimentIntensityAnalyzer"] = None
+
+
+def _get_analyzer() -> "SentimentIntensityAnalyzer":
+    # VADER is imported and its lexicon parsed on first use (or by SentimentEngine.warm_up),
+    # not at import time, so a worker starts serving without paying for it.
+    global _analyzer
+    if _analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def score_texts(texts: List[str]) -> List[float]:
+    """Scores texts synchronously and returns their VADER compound scores (-1..1)."""
+    analyzer = _get_analyzer()
+    return [analyzer.polarity_scores(text[:MAX_TEXT_LENGTH])["compound"] for text in texts]
+
+
+def categorize(score: float) -> str:
+    if score >= POSITIVE_THRESHOLD:
+        return "positive"
+    if score <= NEGATIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def summarize_scores(scores: List[float]) -> Dict[str, Any]:
+    """Aggregates per-post compound scores into a mean score, category and distribution."""
+    if not scores:
+        return {
+            "score": 0.0,
+            "category": "neutral",
+            "distribution": {"mean": 0.0, "stdev": 0.0, "positive": 0, "neutral": 0, "negative": 0},
+        }
+    mean = statistics.fmean(scores)
+    counts = {"positive": 0, "neutral": 0, "negative": 0}
+    for score in scores:
+        counts[categorize(score)] += 1
+    return {
+        "score": round(mean, 4),
+        "category": categorize(mean),
+        "distribution": {
+            "mean": round(mean, 4),
+            "stdev": round(statistics.pstdev(scores), 4),
+            **counts,
+        },
+    }
+
+
+class SentimentEngine:
+    """
+    Scores all texts for a symbol in one batch. Small batches run in a thread; batches of at
+    least `process_pool_threshold` texts are split into chunks and scored in a process pool,
+    so CPU-bound scoring of thousands of posts never holds the event loop (or the GIL).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, process_pool_threshold: int = 200, chunk_size: int = 250):
+        self.max_workers = max_workers
+        self.process_pool_threshold = process_pool_threshold
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn avoids forking a process that already runs the event loop and worker threads.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_get_analyzer,
+            )
+            logger.info("Sentiment scoring process pool started.")
+        return self._pool
+
+    async def score_texts(self, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        if len(texts) < self.process_pool_threshold:
+            return await asyncio.to_thread(score_texts, texts)
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(pool, score_texts, chunk) for chunk in chunks))
+        return [score for chunk_scores in results for score in chunk_scores]
+
+    async def warm_up(self):
+        """Loads the VADER lexicon in a thread, so the first scored request does not pay for it."""
+        await asyncio.to_thread(_get_analyzer)
+
+    async def analyze(self, texts: List[str]) -> Dict[str, Any]:
+        """Scores texts and returns the summary from summarize_scores."""
+        return summarize_scores(await self.score_texts(texts))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("Sentiment scoring process pool shut down.")
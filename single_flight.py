@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key so only one upstream fetch runs at a time.
+    Every caller for an in-flight key awaits the same task and receives its result (or
+    exception). The shared task is shielded, so a caller disconnecting does not cancel
+    the fetch for everyone else.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.coalesced_by_kind: Dict[str, int] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            kind = str(key[0]) if isinstance(key, tuple) and key else str(key)
+            self.coalesced_by_kind[kind] = self.coalesced_by_kind.get(kind, 0) + 1
+            logger.debug(f"Coalescing call for {key} onto in-flight request.")
+            return await asyncio.shield(task)
+
+        self.executed += 1
+        task = asyncio.ensure_future(func(*args, **kwargs))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        return await asyncio.shield(task)
+
+    async def do_batch(self, items: Dict[Hashable, Hashable], func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Runs one batched call on behalf of several keys. `items` maps each flight key to its
+        key in the dict the call returns; while the batch runs, do() callers for those flight
+        keys coalesce onto it and receive their own item. Keys already in flight are left alone.
+        """
+        self.executed += 1
+        batch = asyncio.ensure_future(func(*args, **kwargs))
+        for key, item in items.items():
+            if key in self._in_flight:
+                continue
+            task = asyncio.ensure_future(self._batch_item(batch, item))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        return await asyncio.shield(batch)
+
+    @staticmethod
+    async def _batch_item(batch: asyncio.Future, item: Hashable) -> Any:
+        return (await asyncio.shield(batch)).get(item)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Single-flight call for {key} finished with {task.exception()!r}")
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_by_kind": dict(self.coalesced_by_kind),
+            "in_flight": len(self._in_flight),
+        }
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
-import Select from 'react-select';
-import { FaInfoCircle, FaSearch, FaRedo } from 'react-icons/fa';
+import AsyncSelect from 'react-select/async';
+import { FaInfoCircle, FaSearch, FaRedo, FaTimes } from 'react-icons/fa';
 
 import useTickers from './hooks/useTickers';
 import useAnalysis from './hooks/useAnalysis';
@@ -14,7 +14,7 @@ import NewsCard from './components/NewsCard';
 function App() {
   const [selectedStock, setSelectedStock] = useState(null);
 
-  const { tickerOptions, isTickersLoading, tickerError, refetchTickers, hasTickers } = useTickers();
+  const { loadTickerOptions, isTickersLoading, tickerError, tickerSearchKey, dismissTickerError } = useTickers();
   const { analysisData, isAnalysisLoading, analysisError, refetchAnalysis } = useAnalysis(
     selectedStock?.value,
     selectedStock?.name
@@ -77,24 +77,20 @@ function App() {
       </header>
 
       <main className="w-full max-w-xl z-10 mb-8">
-        <Select
-          options={tickerOptions}
+        <AsyncSelect
+          key={tickerSearchKey}
+          loadOptions={loadTickerOptions}
+          cacheOptions
           onChange={handleStockChange}
           value={selectedStock}
           isLoading={isTickersLoading}
           isClearable
           isSearchable
-          placeholder={
-            tickerError
-              ? MESSAGES.PLACEHOLDER_FAILED_TICKERS
-              : isTickersLoading
-              ? MESSAGES.PLACEHOLDER_LOADING_TICKERS
-              : MESSAGES.PLACEHOLDER_SEARCH_STOCK
-          }
+          placeholder={tickerError ? MESSAGES.PLACEHOLDER_FAILED_TICKERS : MESSAGES.PLACEHOLDER_SEARCH_STOCK}
+          noOptionsMessage={({ inputValue }) => (inputValue ? MESSAGES.NO_TICKERS_FOUND : MESSAGES.PLACEHOLDER_SEARCH_STOCK)}
           styles={customSelectStyles}
           aria-label="Search for a stock"
           components={{ DropdownIndicator: () => <FaSearch className="mr-3 text-gray-400" />, IndicatorSeparator: () => null }}
-          isDisabled={isTickersLoading && !tickerError && !hasTickers} // Disable if loading and no tickers loaded yet
         />
         {tickerError && (
           <div className="bg-red-800 border-l-4 border-red-500 text-red-100 p-3 rounded-lg shadow-lg mt-4 animate-fade-in-up flex items-center justify-between" role="alert">
@@ -103,20 +99,14 @@ function App() {
               <p className="mt-1 text-sm">{tickerError}</p>
             </div>
             <button
-              onClick={refetchTickers}
+              onClick={dismissTickerError}
               className="ml-4 px-3 py-1 bg-red-600 hover:bg-red-700 rounded-md text-white text-sm font-semibold flex items-center"
-              aria-label={MESSAGES.RETRY_BUTTON + " loading tickers"}
+              aria-label={MESSAGES.DISMISS_BUTTON + " ticker error"}
             >
-              <FaRedo className="mr-2" /> {MESSAGES.RETRY_BUTTON}
+              <FaTimes className="mr-2" /> {MESSAGES.DISMISS_BUTTON}
             </button>
           </div>
         )}
-        {!isTickersLoading && !tickerError && !hasTickers && ( // ✅ UI for no tickers found
-             <div className="bg-yellow-800 border-l-4 border-yellow-500 text-yellow-100 p-3 rounded-lg shadow-lg mt-4 animate-fade-in-up flex items-center" role="status">
-                <FaInfoCircle className="mr-2" />
-                <p className="text-sm">No stock tickers found. The API might be empty or unavailable.</p>
-             </div>
-        )}
       </main>
 
       <div className="w-full max-w-4xl">
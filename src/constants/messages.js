@@ -1,11 +1,12 @@
 export const MESSAGES = {
   APP_TITLE: "Stock Hype Recommender",
   APP_DESCRIPTION: "Analyze social media sentiment, financial data, and news for any stock.",
-  PLACEHOLDER_LOADING_TICKERS: "Loading stocks...",
   PLACEHOLDER_FAILED_TICKERS: "Failed to load stocks. See error below.",
   PLACEHOLDER_SEARCH_STOCK: "Search for a stock (e.g., AAPL or Apple)...",
+  NO_TICKERS_FOUND: "No matching stocks found.",
   ERROR_LOADING_TICKERS_TITLE: "Error Loading Tickers",
   RETRY_BUTTON: "Retry",
+  DISMISS_BUTTON: "Dismiss",
   ANALYSIS_LOADING: "Scouring the web for the latest data...",
   ANALYSIS_ERROR_TITLE: "Error Analyzing Stock",
   WELCOME_TITLE: "Welcome!",
@@ -1,31 +1,68 @@
-import { useCallback, useMemo } from 'react';
-import useApiFetch from './useApiFetch';
-import { API_BASE_URL } from '../constants/api'; 
+import { useCallback, useRef, useState } from 'react';
+import { API_BASE_URL } from '../constants/api';
+
+const SEARCH_LIMIT = 20;
+
+const toTickerOption = (stock) => ({
+  value: stock.symbol,
+  label: `${stock.symbol} - ${stock.name}`,
+  name: stock.name,
+});
 
 const useTickers = () => {
-  const apiUrl = useMemo(() => `${API_BASE_URL}/tickers`, []);
-  const { data, loading, error, fetchData } = useApiFetch(apiUrl);
-
-  const tickerOptions = useMemo(() => {
-    if (data && Array.isArray(data)) {
-      return data.map(stock => ({
-        value: stock.symbol,
-        label: `${stock.symbol} - ${stock.name}`,
-        name: stock.name,
-      }));
+  const [isTickersLoading, setIsTickersLoading] = useState(false);
+  const [tickerError, setTickerError] = useState(null);
+  const [tickerSearchKey, setTickerSearchKey] = useState(0);
+  const abortControllerRef = useRef(null);
+
+  // Queries the server-side search index instead of downloading the full ticker list.
+  const loadTickerOptions = useCallback(async (inputValue) => {
+    const query = inputValue.trim();
+    if (!query) return [];
+
+    if (abortControllerRef.current) {
+      abortControllerRef.current.abort();
+    }
+    abortControllerRef.current = new AbortController();
+    const signal = abortControllerRef.current.signal;
+
+    setIsTickersLoading(true);
+    setTickerError(null);
+
+    try {
+      const params = new URLSearchParams({ q: query, limit: String(SEARCH_LIMIT) });
+      const res = await fetch(`${API_BASE_URL}/tickers/search?${params.toString()}`, { signal });
+      if (!res.ok) {
+        const errorBody = await res.json().catch(() => ({}));
+        throw new Error(errorBody.detail || `HTTP error! Status: ${res.status}`);
+      }
+      const data = await res.json();
+      return Array.isArray(data) ? data.map(toTickerOption) : [];
+    } catch (err) {
+      if (err.name !== 'AbortError') {
+        console.error("Ticker search error:", err);
+        setTickerError(err.message || "An unknown error occurred.");
+      }
+      return [];
+    } finally {
+      if (!signal.aborted) setIsTickersLoading(false);
     }
-    return [];
-  }, [data]);
+  }, []);
 
-  const refetchTickers = useCallback(() => fetchData(apiUrl), [fetchData, apiUrl]);
+  // Hides the error and bumps the key that remounts the search box, dropping the empty
+  // results cached for failed queries so typing the same query again re-runs the search.
+  const dismissTickerError = useCallback(() => {
+    setTickerError(null);
+    setTickerSearchKey((key) => key + 1);
+  }, []);
 
   return {
-    tickerOptions,
-    isTickersLoading: loading,
-    tickerError: error,
-    refetchTickers,
-    hasTickers: tickerOptions.length > 0
+    loadTickerOptions,
+    isTickersLoading,
+    tickerError,
+    tickerSearchKey,
+    dismissTickerError,
   };
 };
 
-export default useTickers
\ No newline at end of file
+export default useTickers
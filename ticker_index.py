@@ -0,0 +1,123 @@
+import bisect
+import difflib
+import re
+from typing import Dict, List, Set, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+MAX_PREFIX_CANDIDATES = 256
+MIN_NAME_TOKEN_LENGTH = 2
+FUZZY_CUTOFF = 0.75
+FUZZY_MAX_LENGTH_DIFFERENCE = 2
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class TickerSearchIndex:
+    """
+    In-memory search index over the filtered ticker list.
+
+    Symbols are kept sorted for bisect-based prefix search; company names are split into
+    tokens with an inverted index (token -> ticker positions) and a sorted vocabulary, so
+    every query token can be matched as a prefix. When nothing matches exactly or by prefix,
+    close spellings of name tokens are tried as a fuzzy fallback.
+    """
+
+    def __init__(self, tickers: List[Dict[str, str]]):
+        self.tickers = tickers
+        symbol_pairs = sorted((t["symbol"].upper(), i) for i, t in enumerate(tickers))
+        self._symbols = [symbol for symbol, _ in symbol_pairs]
+        self._symbol_positions = [i for _, i in symbol_pairs]
+
+        self._name_tokens = [_tokenize(t.get("name", "")) for t in tickers]
+        postings: Dict[str, Set[int]] = {}
+        for i, name_tokens in enumerate(self._name_tokens):
+            for token in name_tokens:
+                postings.setdefault(token, set()).add(i)
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+        # Fuzzy candidates are bucketed by (first letter, length) to keep difflib's work small.
+        self._fuzzy_buckets: Dict[Tuple[str, int], List[str]] = {}
+        for token in self._vocabulary:
+            self._fuzzy_buckets.setdefault((token[0], len(token)), []).append(token)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def _symbol_prefix_matches(self, prefix: str) -> List[int]:
+        start = bisect.bisect_left(self._symbols, prefix)
+        matches = []
+        for j in range(start, min(start + MAX_PREFIX_CANDIDATES, len(self._symbols))):
+            if not self._symbols[j].startswith(prefix):
+                break
+            matches.append(self._symbol_positions[j])
+        return matches
+
+    def _token_prefix_matches(self, prefix: str) -> Set[int]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches: Set[int] = set()
+        for j in range(start, min(start + MAX_PREFIX_CANDIDATES, len(self._vocabulary))):
+            token = self._vocabulary[j]
+            if not token.startswith(prefix):
+                break
+            matches |= self._postings[token]
+        return matches
+
+    def _fuzzy_token_matches(self, token: str) -> Set[int]:
+        candidates = []
+        for length in range(len(token) - FUZZY_MAX_LENGTH_DIFFERENCE, len(token) + FUZZY_MAX_LENGTH_DIFFERENCE + 1):
+            candidates.extend(self._fuzzy_buckets.get((token[0], length), ()))
+        matches: Set[int] = set()
+        for close_token in difflib.get_close_matches(token, candidates, n=5, cutoff=FUZZY_CUTOFF):
+            matches |= self._postings[close_token]
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        query = query.strip()
+        if not query or not self.tickers:
+            return []
+
+        scores: Dict[int, float] = {}
+
+        def _score(position: int, score: float):
+            if score > scores.get(position, 0):
+                scores[position] = score
+
+        symbol_query = query.upper().replace(" ", "")
+        for position in self._symbol_prefix_matches(symbol_query):
+            symbol = self.tickers[position]["symbol"].upper()
+            # Exact symbol first, then shorter symbols with the same prefix.
+            _score(position, 100 if symbol == symbol_query else 80 - min(len(symbol) - len(symbol_query), 10))
+
+        query_tokens = [token for token in _tokenize(query) if len(token) >= MIN_NAME_TOKEN_LENGTH]
+        if query_tokens:
+            name_matches = None
+            for token in query_tokens:
+                token_matches = self._token_prefix_matches(token)
+                name_matches = token_matches if name_matches is None else name_matches & token_matches
+                if not name_matches:
+                    break
+            for position in name_matches or ():
+                name_tokens = self._name_tokens[position]
+                leading = 5 if name_tokens and name_tokens[0].startswith(query_tokens[0]) else 0
+                exact = 5 if all(token in name_tokens for token in query_tokens) else 0
+                _score(position, 50 + leading + exact)
+
+            if not scores:
+                fuzzy_matches = None
+                for token in query_tokens:
+                    token_matches = self._token_prefix_matches(token) | self._fuzzy_token_matches(token)
+                    fuzzy_matches = token_matches if fuzzy_matches is None else fuzzy_matches & token_matches
+                    if not fuzzy_matches:
+                        break
+                for position in fuzzy_matches or ():
+                    _score(position, 30)
+
+        ranked: List[Tuple[float, int, str, int]] = [
+            (-score, len(self.tickers[position]["symbol"]), self.tickers[position]["symbol"], position)
+            for position, score in scores.items()
+        ]
+        ranked.sort()
+        return [self.tickers[position] for *_, position in ranked[:limit]]
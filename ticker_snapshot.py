@@ -0,0 +1,42 @@
+import gzip
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path: str, tickers: List[Dict[str, str]]):
+    """
+    Writes the filtered ticker list as gzipped JSON [symbol, name] pairs. The file is
+    written next to its destination and renamed into place, so readers never see a partial file.
+    """
+    payload = {"version": SNAPSHOT_VERSION, "tickers": [[t["symbol"], t.get("name", "")] for t in tickers]}
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_snapshot(path: str) -> Optional[Tuple[List[Dict[str, str]], float]]:
+    """Returns (tickers, saved_at) from a snapshot written by save_snapshot, or None if there is no usable one."""
+    try:
+        saved_at = os.path.getmtime(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != SNAPSHOT_VERSION:
+            return None
+        tickers = [{"symbol": symbol, "name": name} for symbol, name in payload["tickers"]]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable ticker snapshot {path}: {e}")
+        return None
+    return (tickers, saved_at) if tickers else None
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import reddit_scraper
+from prefetch import HotSymbolTracker
+
+logger = logging.getLogger(__name__)
+
+# Bare (non-cashtag) symbols shorter than this, or that are everyday words in caps, are too
+# ambiguous to count ("A", "IT", "ALL", "NOW"). Cashtags always count.
+MIN_BARE_SYMBOL_LENGTH = 3
+MIN_COMPANY_NAME_LENGTH = 5
+# Company names are only matched when their core has at least this many words: one-word cores
+# are too often ordinary words ("match", "block"), so those symbols need a cashtag or ticker.
+MIN_COMPANY_NAME_WORDS = 2
+AMBIGUOUS_WORDS = frozenset("""
+    all are ath best big can cash ceo cfo dd eps etf fast for fomo fun gdp go good has hope imo ipo
+    key lol love low most move new now one open out play post real run save see tech two usa well
+    wsb yolo next life bank general main united target national
+""".split())
+_NAME_SUFFIX_PATTERN = re.compile(
+    r"[,.]?\s+(inc|corp|corporation|co|company|ltd|limited|plc|holdings?|group|sa|nv|ag|lp|llc|trust|class [a-z])\.?$"
+)
+SEEN_POSTS_PER_SUBREDDIT = 500
+
+
+def _core_company_name(name: str) -> str:
+    """Strips legal suffixes: "Apple Inc." -> "apple", "Tesla, Inc." -> "tesla"."""
+    core = name.lower().strip()
+    while True:
+        stripped = _NAME_SUFFIX_PATTERN.sub("", core).strip(" ,.")
+        if stripped == core:
+            return core
+        core = stripped
+
+
+class MentionMatcher:
+    """
+    Aho-Corasick automaton over symbols (aapl) and multi-word core company names (advanced
+    micro devices) for every ticker, so one pass over a post's text finds all mentioned symbols.
+    A symbol match counts as a cashtag when it directly follows "$", so cashtags need no
+    patterns of their own. Matching runs on lowercased text; matches must sit on word
+    boundaries, and bare symbols must be written in upper case in the original text.
+    """
+
+    def __init__(self, tickers: List[Dict[str, str]]):
+        self.tickers = tickers
+        # Trie as parallel lists: transitions, failure link, and outputs per node. An output is
+        # (symbol, pattern length, is_symbol, bare_allowed); names have is_symbol False.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, int, bool, bool]]] = [[]]
+        for ticker in tickers:
+            symbol = ticker["symbol"]
+            if not symbol.isalnum():
+                continue
+            lowered = symbol.lower()
+            self._add(lowered, (symbol, len(lowered), True, len(symbol) >= MIN_BARE_SYMBOL_LENGTH and lowered not in AMBIGUOUS_WORDS))
+            core = _core_company_name(ticker.get("name", ""))
+            if len(core) >= MIN_COMPANY_NAME_LENGTH and len(core.split()) >= MIN_COMPANY_NAME_WORDS:
+                self._add(core, (symbol, len(core), False, False))
+        self._build_failure_links()
+
+    def _add(self, pattern: str, output: Tuple[str, int, bool, bool]):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                if node:
+                    fallback = self._fail[node]
+                    while fallback and char not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[child] = self._goto[fallback].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        """Returns the symbols mentioned in text."""
+        lowered = text.lower()
+        found: Set[str] = set()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        node = 0
+        for end, char in enumerate(lowered, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for symbol, length, is_symbol, bare_allowed in outputs[node]:
+                start = end - length
+                if end < len(lowered) and lowered[end].isalnum():
+                    continue
+                if is_symbol and start > 0 and lowered[start - 1] == "$":
+                    start -= 1
+                elif is_symbol and not (bare_allowed and text[start:end].isupper()):
+                    continue
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                found.add(symbol)
+        return found
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class TrendingScanner:
+    """
+    Market-wide hype tracker. Every `interval_seconds` it fetches the newest posts of each
+    subreddit (one Reddit request per subreddit), extracts mentioned symbols with a
+    MentionMatcher built from the ticker list, and adds one mention per symbol per post to
+    an exponentially decayed counter. `tickers_provider` returns the ticker list with a
+    version (its ETag); the matcher is rebuilt, in a thread, only when the version changes.
+    """
+
+    def __init__(
+        self,
+        subreddits: List[str],
+        tickers_provider: Callable[[], Awaitable[Optional[Tuple[List[Dict[str, str]], str]]]],
+        interval_seconds: float = 120,
+        half_life_seconds: float = 3600,
+        max_symbols: int = 5000,
+    ):
+        self.subreddits = subreddits
+        self.tickers_provider = tickers_provider
+        self.interval_seconds = interval_seconds
+        self.tracker = HotSymbolTracker(half_life_seconds, max_symbols)
+        self.half_life_seconds = half_life_seconds
+        self._matcher: Optional[MentionMatcher] = None
+        self._matcher_version: Optional[str] = None
+        self._matcher_lock = asyncio.Lock()
+        self._names: Dict[str, str] = {}
+        # Per subreddit: newest created_utc seen, plus recent fullnames to skip posts sharing that second.
+        self._watermarks: Dict[str, float] = {}
+        self._seen: Dict[str, deque] = {subreddit: deque(maxlen=SEEN_POSTS_PER_SUBREDDIT) for subreddit in subreddits}
+        self._last_mentions: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.scans = 0
+        self.posts_scanned = 0
+        self.last_scan_at: Optional[float] = None
+
+    async def _get_matcher(self) -> Optional[MentionMatcher]:
+        provided = await self.tickers_provider()
+        if not provided or not provided[0]:
+            return self._matcher
+        tickers, version = provided
+        async with self._matcher_lock:
+            if self._matcher is None or self._matcher_version != version:
+                build_started = time.perf_counter()
+                self._matcher = await asyncio.to_thread(MentionMatcher, tickers)
+                self._matcher_version = version
+                self._names = {ticker["symbol"]: ticker.get("name", "") for ticker in tickers}
+                logger.info(f"Built mention matcher over {len(tickers)} tickers ({len(self._matcher)} states) in {(time.perf_counter() - build_started) * 1000:.0f} ms.")
+        return self._matcher
+
+    async def warm_up(self) -> bool:
+        """Builds the mention matcher ahead of the first scan. Returns False if no ticker list is available."""
+        return await self._get_matcher() is not None
+
+    def _new_posts(self, subreddit: str, posts: List[Dict]) -> List[Dict]:
+        watermark = self._watermarks.get(subreddit, 0.0)
+        seen = self._seen[subreddit]
+        fresh = []
+        for post in posts:
+            data = post.get("data", {})
+            created = float(data.get("created_utc") or 0)
+            name = data.get("name")
+            if created < watermark or name in seen:
+                continue
+            fresh.append(data)
+            seen.append(name)
+        if fresh:
+            self._watermarks[subreddit] = max(watermark, max(float(data.get("created_utc") or 0) for data in fresh))
+        return fresh
+
+    async def scan(self):
+        matcher = await self._get_matcher()
+        if matcher is None:
+            logger.warning("Ticker list unavailable; skipping trending scan.")
+            return
+        async with reddit_scraper.session_scope() as session:
+            results = await asyncio.gather(
+                *(reddit_scraper.fetch_subreddit_new(session, subreddit) for subreddit in self.subreddits),
+                return_exceptions=True,
+            )
+
+        mentions: Dict[str, int] = {}
+        posts_scanned = 0
+        for subreddit, result in zip(self.subreddits, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching new posts from r/{subreddit}: {result}")
+                continue
+            for data in self._new_posts(subreddit, result):
+                posts_scanned += 1
+                for symbol in matcher.find(f"{data.get('title', '')}\n{data.get('selftext', '')}"):
+                    mentions[symbol] = mentions.get(symbol, 0) + 1
+                    self.tracker.record(symbol)
+
+        self._last_mentions = mentions
+        self.scans += 1
+        self.posts_scanned += posts_scanned
+        self.last_scan_at = time.time()
+        logger.info(f"Trending scan: {posts_scanned} new posts, {len(mentions)} symbols mentioned.")
+
+    def trending(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return [
+            {"symbol": symbol, "name": self._names.get(symbol, ""), "score": score, "mentions_last_scan": self._last_mentions.get(symbol, 0)}
+            for symbol, score in self.tracker.top(limit)
+        ]
+
+    async def _run(self):
+        while True:
+            try:
+                await self.scan()
+            except Exception:
+                logger.exception("Unexpected error in trending scan:")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Trending scanner started (every {self.interval_seconds}s over {len(self.subreddits)} subreddits).")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scans": self.scans,
+            "posts_scanned": self.posts_scanned,
+            "last_scan_at": self.last_scan_at,
+            "matcher_states": len(self._matcher) if self._matcher else 0,
+        }
@@ -1,73 +1,283 @@
-""" code might work i am not sure never hada chance to test it since greedy x wants thousands of dollars
-import os
-import logging
-import tweepy
+import aiohttp
 import asyncio
+import logging
+import os
+import re
 import time
+from typing import Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS, observe_upstream
 
-logger = logging.getLogger("uvicorn.error")
+logger = logging.getLogger(__name__)
+
+class XScrapingError(Exception):
+    pass
+
+class XRateLimitError(XScrapingError):
+    pass
 
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
+X_API_BASE_URL = os.getenv("X_API_BASE_URL", "https://api.twitter.com")
+X_SEARCH_ENDPOINT = "/2/tweets/search/recent"
 
-twitter_client = None
-if TWITTER_BEARER_TOKEN:
-    try:
-        twitter_client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
-        logger.info("Tweepy client initialized successfully for Twitter API.")
-    except Exception as e:
-        logger.error(f"Error initializing Tweepy client: {e}. X scraping will use mock data.")
-        twitter_client = None
-else:
+# Recent search allows 512 characters per query on the basic tiers and 10-100 results per page.
+X_QUERY_MAX_LENGTH = 512
+X_QUERY_SUFFIX = " -is:retweet lang:en"
+X_MAX_SYMBOLS_PER_QUERY = 10
+X_RESULTS_PER_PAGE = 100
+X_MAX_PAGES_PER_QUERY = 2
+X_POSTS_PER_SYMBOL = 20
+X_MAX_RETRIES = 3
+# A 429 is retried after the reset time only if that is at most this far away.
+X_MAX_RATE_LIMIT_WAIT_SECONDS = 30
+X_REQUEST_TIMEOUT_SECONDS = 10
+# Single-symbol lookups arriving within this window are folded into one batched search.
+X_BATCH_WINDOW_SECONDS = 0.05
+X_CACHE_TTL_SECONDS = int(os.getenv("X_CACHE_TTL_SECONDS", "900"))
+X_CACHE_MAX_ENTRIES = 5000
+
+_CASHTAG_PATTERN = re.compile(r'\$([A-Za-z][A-Za-z0-9]{0,5})\b')
+_VALID_CASHTAG_PATTERN = re.compile(r'^[A-Z][A-Z0-9]{0,5}$')
+
+# Per-symbol tweet texts. Replace with a backend-backed cache (see main.py) to share results across workers.
+post_cache = TTLCache("x_posts", X_CACHE_TTL_SECONDS, X_CACHE_MAX_ENTRIES)
+
+_session: Optional[aiohttp.ClientSession] = None
+_pending: Dict[str, asyncio.Future] = {}
+_flush_task: Optional[asyncio.Task] = None
+_stats = {"searches": 0, "pages": 0, "symbols_searched": 0, "batched_lookups": 0}
+
+if not TWITTER_BEARER_TOKEN:
     logger.warning("TWITTER_BEARER_TOKEN environment variable not set. X scraping will use mock data.")
 
-async def scrape_x_data(keyword: str, limit: int = 10, max_retries: int = 3, initial_delay: int = 1) -> list[str]:
-  
-    if not twitter_client:
-        logger.warning(f"Tweepy client not initialized. Using mock X data for '{keyword}'.")
-        mock_x_posts = [
-            f"Just bought more {keyword}! To the moon! 🚀",
-            f"Bearish on {keyword} after earnings. Sell sell sell!",
-            f"Watching {keyword} closely today. Big moves coming?",
-            f"{keyword} is trending! What's everyone's price target?",
-            f"Don't sleep on {keyword}. Undervalued gem.",
-            f"My portfolio is all {keyword} and dreams.",
-            f"Looks like {keyword} is about to break out.",
-            f"Shorting {keyword}. Wish me luck.",
-            f"Anyone else think {keyword} is overhyped?",
-            f"Solid fundamentals on {keyword}, ignoring the noise.",
-        ]
-        return [post for post in mock_x_posts if keyword.lower() in post.lower()][:limit]
-
-    logger.info(f"Scraping X (Twitter) for '{keyword}'...")
-    retries = 0
-    delay = initial_delay
-    while retries < max_retries:
+
+def _create_session() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(headers={"Authorization": f"Bearer {TWITTER_BEARER_TOKEN}"})
+
+async def open_session() -> Optional[aiohttp.ClientSession]:
+    """Opens the shared X API session. Called from the app startup hook; a no-op without a bearer token."""
+    global _session
+    if TWITTER_BEARER_TOKEN and (_session is None or _session.closed):
+        _session = _create_session()
+        logger.info("Shared aiohttp ClientSession opened for X scraping.")
+    return _session
+
+async def close_session():
+    """Closes the shared X API session. Called from the app shutdown hook."""
+    global _session
+    if _session and not _session.closed:
+        await _session.close()
+        logger.info("Shared aiohttp ClientSession closed for X scraping.")
+    _session = None
+
+async def warm_up(timeout: float = 5) -> bool:
+    """Pre-opens a pooled connection to the X API with a HEAD request. Returns False without a bearer token."""
+    session = await open_session()
+    if session is None:
+        return False
+    try:
+        async with session.head(X_API_BASE_URL, timeout=aiohttp.ClientTimeout(total=timeout)):
+            return True
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Could not pre-open a connection to the X API: {e}")
+        return False
+
+def _mock_posts(keyword: str, limit: int) -> List[str]:
+    mock_x_posts = [
+        f"Just bought more {keyword}! To the moon! 🚀",
+        f"Bearish on {keyword} after earnings. Sell sell sell!",
+        f"Watching {keyword} closely today. Big moves coming?",
+        f"{keyword} is trending! What's everyone's price target?",
+        f"Don't sleep on {keyword}. Undervalued gem.",
+        f"My portfolio is all {keyword} and dreams.",
+        f"Looks like {keyword} is about to break out.",
+        f"Shorting {keyword}. Wish me luck.",
+        f"Anyone else think {keyword} is overhyped?",
+        f"Solid fundamentals on {keyword}, ignoring the noise.",
+    ]
+    return mock_x_posts[:limit]
+
+def build_batched_queries(symbols: List[str]) -> List[Tuple[str, List[str]]]:
+    """
+    Packs symbols into OR-joined cashtag queries, e.g. `($AAPL OR $MSFT) -is:retweet lang:en`,
+    each within X_QUERY_MAX_LENGTH and X_MAX_SYMBOLS_PER_QUERY. Returns (query, symbols) pairs.
+    """
+    def _render(group: List[str]) -> str:
+        terms = " OR ".join(f"${symbol}" for symbol in group)
+        return (f"({terms})" if len(group) > 1 else terms) + X_QUERY_SUFFIX
+
+    queries: List[Tuple[str, List[str]]] = []
+    group: List[str] = []
+    for symbol in symbols:
+        candidate = group + [symbol]
+        if group and (len(candidate) > X_MAX_SYMBOLS_PER_QUERY or len(_render(candidate)) > X_QUERY_MAX_LENGTH):
+            queries.append((_render(group), group))
+            candidate = [symbol]
+        group = candidate
+    if group:
+        queries.append((_render(group), group))
+    return queries
+
+def _tweet_cashtags(tweet: Dict) -> set:
+    tags = tweet.get("entities", {}).get("cashtags")
+    if tags:
+        return {tag.get("tag", "").upper() for tag in tags}
+    return {match.upper() for match in _CASHTAG_PATTERN.findall(tweet.get("text", ""))}
+
+async def _fetch_search_page(session: aiohttp.ClientSession, query: str, next_token: Optional[str]) -> Dict:
+    params = {"query": query, "max_results": str(X_RESULTS_PER_PAGE), "tweet.fields": "entities"}
+    if next_token:
+        params["next_token"] = next_token
+    url = X_API_BASE_URL + X_SEARCH_ENDPOINT
+
+    delay = 1
+    for attempt in range(X_MAX_RETRIES):
+        if attempt > 0:
+            UPSTREAM_RETRIES.inc(upstream="x", endpoint="search/recent")
+        request_started = time.perf_counter()
         try:
-          
-            query = f"${keyword} -is:retweet lang:en"
-            
-            tweets = await asyncio.to_thread(twitter_client.search_recent_tweets, query=query, max_results=limit)
-            
-            if tweets.data:
-                x_texts = [tweet.text for tweet in tweets.data]
-                logger.info(f"Successfully scraped {len(x_texts)} posts from X for '{keyword}'.")
-                return x_texts
-            else:
-                logger.info(f"No tweets found for '{keyword}' on X.")
-                return []
-        except tweepy.TweepyException as e:
-            logger.error(f"Tweepy API error during X scraping for '{keyword}' (Attempt {retries + 1}/{max_retries}): {e}")
-            retries += 1
-            if retries < max_retries:
-                logger.info(f"Retrying X scraping in {delay} seconds...")
-                await asyncio.sleep(delay)
-                delay *= 2 
-            else:
-                logger.error(f"Max retries reached for X scraping for '{keyword}'. Falling back to empty list.")
-                return []
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during X (Twitter) scraping for '{keyword}': {e}")
-            return []
-    return []
-
-    """
\ No newline at end of file
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=X_REQUEST_TIMEOUT_SECONDS)) as response:
+                observe_upstream("x", "search/recent", time.perf_counter() - request_started, response.status)
+                if response.status == 429:
+                    reset_at = float(response.headers.get("x-rate-limit-reset", 0) or 0)
+                    wait = max(reset_at - time.time(), 0) if reset_at else delay
+                    if wait > X_MAX_RATE_LIMIT_WAIT_SECONDS or attempt == X_MAX_RETRIES - 1:
+                        raise XRateLimitError(f"X API rate limit exceeded; resets in {wait:.0f}s.")
+                    logger.warning(f"X API rate limited. Retrying in {wait:.1f} seconds...")
+                    await asyncio.sleep(wait)
+                    continue
+                if response.status >= 500 and attempt < X_MAX_RETRIES - 1:
+                    logger.warning(f"X API returned {response.status}. Retrying in {delay} seconds...")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                    continue
+                if response.status != 200:
+                    raise XScrapingError(f"X API error {response.status}: {await response.text()}")
+                return await response.json()
+        except asyncio.TimeoutError:
+            observe_upstream("x", "search/recent", time.perf_counter() - request_started)
+            UPSTREAM_TIMEOUTS.inc(upstream="x", endpoint="search/recent")
+            logger.error(f"X API request timed out (Attempt {attempt + 1}/{X_MAX_RETRIES}).")
+        except aiohttp.ClientError as e:
+            observe_upstream("x", "search/recent", time.perf_counter() - request_started)
+            UPSTREAM_ERRORS.inc(upstream="x", endpoint="search/recent")
+            logger.error(f"Network error calling X API (Attempt {attempt + 1}/{X_MAX_RETRIES}): {e}")
+        if attempt < X_MAX_RETRIES - 1:
+            await asyncio.sleep(delay)
+            delay *= 2
+    raise XScrapingError(f"X API request failed after {X_MAX_RETRIES} attempts.")
+
+async def _search_symbols(session: aiohttp.ClientSession, query: str, symbols: List[str], per_symbol: int) -> Dict[str, List[str]]:
+    """Runs one batched query and splits the returned tweets per symbol by their cashtags."""
+    results: Dict[str, List[str]] = {symbol: [] for symbol in symbols}
+    next_token = None
+    _stats["searches"] += 1
+    _stats["symbols_searched"] += len(symbols)
+    for _ in range(X_MAX_PAGES_PER_QUERY):
+        page = await _fetch_search_page(session, query, next_token)
+        _stats["pages"] += 1
+        for tweet in page.get("data", []):
+            for symbol in _tweet_cashtags(tweet).intersection(results):
+                if len(results[symbol]) < per_symbol:
+                    results[symbol].append(tweet.get("text", ""))
+        next_token = page.get("meta", {}).get("next_token")
+        if not next_token or all(len(texts) >= per_symbol for texts in results.values()):
+            break
+    return results
+
+async def scrape_x_data_batch(symbols: List[str], limit: int = X_POSTS_PER_SYMBOL) -> Dict[str, List[str]]:
+    """
+    Returns recent tweet texts per symbol. Cached symbols are served from post_cache; the rest
+    are searched with as few OR-joined cashtag queries as fit the query limits. Symbols whose
+    query fails map to an empty list and are not cached.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    if not TWITTER_BEARER_TOKEN:
+        return {symbol: _mock_posts(symbol, limit) for symbol in symbols}
+
+    results: Dict[str, List[str]] = {}
+    missing = []
+    for symbol in symbols:
+        if post_cache.backend is not None and post_cache.get_entry(symbol) is None:
+            await post_cache.load_from_backend(symbol)
+        cached = post_cache.get(symbol)
+        if cached is not None:
+            results[symbol] = cached[:limit]
+        elif not _VALID_CASHTAG_PATTERN.match(symbol):
+            results[symbol] = []
+        else:
+            missing.append(symbol)
+    if not missing:
+        return results
+
+    shared_session = _session if _session is not None and not _session.closed else None
+    session = shared_session or _create_session()
+    queries = build_batched_queries(missing)
+    try:
+        outcomes = await asyncio.gather(
+            *(_search_symbols(session, query, group, max(limit, X_POSTS_PER_SYMBOL)) for query, group in queries),
+            return_exceptions=True,
+        )
+    finally:
+        if shared_session is None:
+            await session.close()
+
+    for (query, group), outcome in zip(queries, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Error scraping X for {', '.join(group)}: {outcome}")
+            results.update({symbol: [] for symbol in group})
+            continue
+        for symbol, texts in outcome.items():
+            post_cache.set(symbol, texts)
+            await post_cache.persist(symbol)
+            results[symbol] = texts[:limit]
+    logger.info(f"Scraped X for {len(missing)} symbols with {len(queries)} batched queries.")
+    return results
+
+async def _flush_pending():
+    global _flush_task
+    await asyncio.sleep(X_BATCH_WINDOW_SECONDS)
+    batch = dict(_pending)
+    _pending.clear()
+    _flush_task = None
+    _stats["batched_lookups"] += len(batch)
+    try:
+        results = await scrape_x_data_batch(list(batch))
+    except Exception:
+        logger.exception("Unexpected error during batched X scraping:")
+        results = {}
+    for symbol, future in batch.items():
+        if not future.done():
+            future.set_result(results.get(symbol, []))
+
+async def scrape_x_data(keyword: str, limit: int = 10) -> List[str]:
+    """
+    Returns recent tweet texts for one symbol. Concurrent lookups within X_BATCH_WINDOW_SECONDS
+    share a batched search; without TWITTER_BEARER_TOKEN mock posts are returned.
+    """
+    global _flush_task
+    symbol = keyword.upper()
+    if not TWITTER_BEARER_TOKEN:
+        logger.debug(f"Using mock X data for '{symbol}'.")
+        return _mock_posts(symbol, limit)
+    cached = post_cache.get(symbol)
+    if cached is not None:
+        return cached[:limit]
+
+    future = _pending.get(symbol)
+    if future is None:
+        future = asyncio.get_running_loop().create_future()
+        _pending[symbol] = future
+        if _flush_task is None:
+            _flush_task = asyncio.create_task(_flush_pending())
+    return (await asyncio.shield(future))[:limit]
+
+def stats() -> Dict[str, object]:
+    searches = _stats["searches"]
+    return {
+        **_stats,
+        "symbols_per_search": round(_stats["symbols_searched"] / searches, 2) if searches else 0.0,
+        "mock_data": not TWITTER_BEARER_TOKEN,
+        "cache": post_cache.stats(),
+    }